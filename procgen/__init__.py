@@ -0,0 +1,5 @@
+#Procedural generation of floor plans with their descriptions, see README.md
+from .config import Config
+from .generation import generate_plan, generate_plans, generate_sample, generate_samples, plan_random
+from .store import LayoutStore, render_layout
+from .cli import main, run
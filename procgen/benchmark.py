@@ -0,0 +1,178 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from time import perf_counter
+import numpy as np
+from .config import Config
+from .generation import batches, encode_sample, generate_batch
+from .output import open_writer
+
+try:
+  import resource
+except ImportError:
+  #Not available on Windows, where no peak memory is reported
+  resource = None
+
+
+#Stages of a plan in the order they run, saving covers encoding and writing a sample
+stages = ["bounds", "growth", "walls", "topology", "openings", "checks", "semantics", "deduplication", "validation",
+          "scaling", "symbology", "captioning", "saving"]
+#Canvases benchmarked by default: the configured size ranges, and the smallest and largest canvas
+default_canvases = ["default", "60x60", "119x119"]
+
+
+def canvas_config(config, canvas):
+  #Fix the canvas of all plans to <width>x<height>, or keep the configured ranges with "default"
+  if canvas == "default":
+    return config
+  width, height = (int(n) for n in canvas.split("x"))
+  return replace(config, min_width=width, max_width=width + 1, min_height=height, max_height=height + 1)
+
+
+def percentiles(seconds):
+  ms = np.array(seconds) * 1000
+  return {
+    "count": len(ms),
+    "mean_ms": float(ms.mean()),
+    "p50_ms": float(np.percentile(ms, 50)),
+    "p90_ms": float(np.percentile(ms, 90)),
+    "p99_ms": float(np.percentile(ms, 99))
+  }
+
+
+def peak_rss():
+  #Peak resident memory of this process in bytes
+  if resource is None:
+    return None
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss if platform.system() == "Darwin" else rss * 1024
+
+
+def run_case(config, canvas, plans, seed):
+  #Generate and save the plans 0 to plans - 1 of the seed, timing every stage. Runs in a fresh process
+  #per case, so the peak memory belongs to this case alone.
+  config = canvas_config(config, canvas)
+  timings = {}
+  rejections = Counter()
+  with tempfile.TemporaryDirectory() as path:
+    writer = open_writer(config.output_format, path, config.shard_size, config)
+    start = perf_counter()
+    for batch in batches(range(0, plans), config.batch_size):
+      telemetry = []
+      for sample in generate_batch(config, seed, batch, rejections, telemetry):
+        saving = perf_counter()
+        writer.write(sample["index"], encode_sample(config, sample))
+        timings.setdefault("saving", []).append(perf_counter() - saving)
+      for record in telemetry:
+        for stage, seconds in record["stages"].items():
+          timings.setdefault(stage, []).append(seconds)
+    writer.close()
+    seconds = perf_counter() - start
+    written = sum(os.path.getsize(os.path.join(directory, name))
+                  for directory, subdirectories, names in os.walk(path) for name in names)
+  return {
+    "canvas": canvas,
+    "plans": plans,
+    "attempts": plans + sum(rejections.values()),
+    "rejections": dict(rejections),
+    "seconds": seconds,
+    "plans_per_second": plans / seconds,
+    "peak_rss_bytes": peak_rss(),
+    "bytes_per_sample": written / plans,
+    "stages": {stage: percentiles(timings[stage]) for stage in stages if stage in timings}
+  }
+
+
+def git_commit():
+  try:
+    return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def report(case):
+  rss = "n/a" if case["peak_rss_bytes"] is None else "%.1f MiB" % (case["peak_rss_bytes"] / 2 ** 20)
+  print("%s: %d plans (%d attempts) in %.2f s, %.2f plans/s, peak RSS %s, %.0f bytes per sample" % (
+    case["canvas"], case["plans"], case["attempts"], case["seconds"], case["plans_per_second"], rss,
+    case["bytes_per_sample"]))
+  print("  %-12s %8s %10s %10s %10s" % ("stage", "count", "p50 ms", "p90 ms", "p99 ms"))
+  for stage, stats in case["stages"].items():
+    print("  %-12s %8d %10.3f %10.3f %10.3f" % (stage, stats["count"], stats["p50_ms"], stats["p90_ms"],
+                                                 stats["p99_ms"]))
+
+
+def compare(results, baseline, tolerance):
+  #Compare plans/sec and median stage latencies of every canvas with a baseline, and return the
+  #regressions beyond the tolerance (a fraction)
+  regressions = []
+  before = {case["canvas"]: case for case in baseline["cases"]}
+  for case in results["cases"]:
+    old = before.get(case["canvas"])
+    if old is None:
+      continue
+    ratio = case["plans_per_second"] / old["plans_per_second"]
+    print("%s: %.2f plans/s against %.2f (x%.2f)" % (case["canvas"], case["plans_per_second"],
+                                                      old["plans_per_second"], ratio))
+    if ratio < 1 - tolerance:
+      regressions.append("%s plans/s x%.2f" % (case["canvas"], ratio))
+    for stage, stats in case["stages"].items():
+      if stage not in old["stages"]:
+        continue
+      ratio = stats["p50_ms"] / old["stages"][stage]["p50_ms"]
+      print("  %-12s %10.3f ms against %10.3f ms (x%.2f)" % (stage, stats["p50_ms"],
+                                                            old["stages"][stage]["p50_ms"], ratio))
+      if ratio > 1 + tolerance:
+        regressions.append("%s %s p50 x%.2f" % (case["canvas"], stage, ratio))
+  return regressions
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark every stage of the floor plan generation")
+  parser.add_argument("--config", help="JSON file of settings to benchmark instead of the defaults")
+  parser.add_argument("--plans", type=int, default=20, help="plans per canvas")
+  parser.add_argument("--seed", type=int, default=0, help="base seed of the plans")
+  parser.add_argument("--canvas", action="append",
+                      help="'default' or <width>x<height>, can be repeated (default: %s)" % ", ".join(default_canvases))
+  parser.add_argument("--batch-size", type=int, default=1, help="plans generated at once")
+  parser.add_argument("--format", default="files", help="output format the samples are saved in")
+  parser.add_argument("--output", default="benchmark.json", help="file the results are stored in")
+  parser.add_argument("--baseline", help="results of an earlier run to compare with")
+  parser.add_argument("--tolerance", type=float, default=0.1,
+                      help="slowdown against the baseline reported as a regression")
+  args = parser.parse_args()
+  config = Config.load(args.config) if args.config else Config()
+  config = replace(config, batch_size=args.batch_size, output_format=args.format)
+
+  results = {
+    "commit": git_commit(),
+    "python": platform.python_version(),
+    "numpy": np.__version__,
+    "platform": platform.platform(),
+    "seed": args.seed,
+    "batch_size": args.batch_size,
+    "format": args.format,
+    "cases": []
+  }
+  for canvas in args.canvas or default_canvases:
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+      case = executor.submit(run_case, config, canvas, args.plans, args.seed).result()
+    report(case)
+    results["cases"].append(case)
+  with open(args.output, 'w') as f:
+    json.dump(results, f, indent=1)
+  print("Results saved to " + args.output)
+
+  if args.baseline:
+    with open(args.baseline) as f:
+      regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+      print("Regressions: " + ", ".join(regressions))
+      raise SystemExit(1)
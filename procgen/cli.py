@@ -0,0 +1,147 @@
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import repeat
+import os
+import numpy as np
+from .config import argument_parser, config_from_args
+from .dedup import FingerprintIndex
+from .generation import batches, encode_batch, encode_sample, generate_sample, note_encoded_sizes, sample_batch
+from .index import MetadataIndex
+from .manifest import Manifest
+from .output import AsyncWriter, open_writer
+from .telemetry import TelemetryLog
+
+
+def bounded_map(executor, window, fn, *iterables):
+  #Like executor.map, but only window calls run ahead of the consumer, so that a slow writer
+  #holds back the workers instead of piling up their results
+  pending = deque()
+  for args in zip(*iterables):
+    pending.append(executor.submit(fn, *args))
+    if len(pending) > window:
+      yield pending.popleft().result()
+  while pending:
+    yield pending.popleft().result()
+
+
+def run(config):
+  #Generate config.number_of_generations plans and write them to config.output_path, or finish the
+  #unfinished run there, see Manifest
+  manifest = Manifest(config.output_path)
+  last = manifest.runs[-1] if manifest.runs else None
+  if config.existing_runs == "resume" and last is not None:
+    if last["written"] == last["stop"]:
+      print("All " + str(last["stop"] - last["start"]) + " plans of the last run in " + config.output_path + " are written, add more with --existing-runs append")
+      return
+    manifest.check_resumable(config, last)
+    current = last
+    seed = current["base_seed"]
+    print("Resuming with plan " + str(current["written"]) + " of plans " + str(current["start"]) + " to " + str(current["stop"] - 1) + " with base seed " + str(seed))
+  elif config.existing_runs in ["resume", "append"]:
+    #New plans are numbered after the written ones of earlier runs
+    start = 0
+    if last is not None:
+      last["stop"] = last["written"]
+      start = last["written"]
+    seed = config.base_seed
+    if seed is None:
+      seed = np.random.SeedSequence().entropy
+    current = manifest.start_run(config, seed, start, start + config.number_of_generations)
+    manifest.save()
+    print("Generating " + str(config.number_of_generations) + " plans from number " + str(start) + " with base seed " + str(seed))
+  else:
+    raise ValueError("Unknown handling of existing runs " + repr(config.existing_runs))
+
+  indices = batches(range(current["written"], current["stop"]), config.batch_size)
+  rejections = Counter()
+  repairs = Counter()
+  log = None if config.telemetry_path is None else TelemetryLog(config.telemetry_path, config.telemetry_interval)
+  index = None if config.index_name is None else MetadataIndex(os.path.join(config.output_path, config.index_name))
+  if index is not None:
+    index.truncate(current["written"])
+  dedup = None
+  if config.dedup_copies is not None:
+    dedup = FingerprintIndex(os.path.join(config.output_path, "fingerprints.sqlite"), config.dedup_copies)
+
+  output = open_writer(config.output_format, config.output_path, config.shard_size, config)
+  checkpoint = current["written"]
+
+  def written(records, shards, telemetry):
+    nonlocal checkpoint
+    if index is not None:
+      for record, shard in zip(records, shards):
+        index.add(record, shard)
+    if log is not None:
+      note_encoded_sizes(telemetry, records)
+      for attempt in telemetry:
+        log.write(attempt)
+    for record in records:
+      repairs.update(record["metadata"]["repairs"])
+      print("Four images and description saved as number " + str(record["metadata"]["index"]) + " after " + str(record["metadata"]["attempt"] + 1) + " attempt(s)")
+    #Batches are written in order, so all plans up to the last one of this batch are done
+    current["written"] += len(records)
+    if current["written"] - checkpoint >= config.checkpoint_interval:
+      output.flush()
+      if index is not None:
+        index.commit()
+      if dedup is not None:
+        dedup.commit(current["written"])
+      manifest.save()
+      checkpoint = current["written"]
+
+  def deduplicated(item, telemetry, encoded):
+    #Plans are checked for duplicates here in the order of their numbers, so that the same plans pass no
+    #matter how many workers generate them and how plans are batched. Plans whose layout already has too
+    #many copies are replaced by the next attempts at their number.
+    metadata = item["metadata"]
+    if not dedup.allows(metadata["fingerprint"]):
+      rejections["duplicate"] += 1
+      if telemetry is not None:
+        for attempt in telemetry:
+          if attempt["index"] == metadata["index"] and attempt["attempt"] == metadata["attempt"]:
+            attempt["rejection"] = "duplicate"
+            attempt.pop("bytes", None)
+      sample = generate_sample(config, seed, metadata["index"], rejections, telemetry, dedup.allows,
+                               metadata["attempt"] + 1)
+      item = encode_sample(config, sample) if encoded else sample
+    dedup.add(item["metadata"]["fingerprint"], item["metadata"]["index"])
+    return item
+
+  with ProcessPoolExecutor(config.workers) if config.workers > 1 else nullcontext() as executor:
+    #Worker processes send encoded records, otherwise the writer threads encode the samples. Without
+    #workers, duplicates are already rejected before they are rendered.
+    sample_map = partial(bounded_map, executor, 2 * config.workers) if executor else map
+    make_batch = encode_batch if executor else partial(sample_batch, allow=None if dedup is None else dedup.allows)
+    writer = AsyncWriter(output, config.writer_threads, config.writer_queue_size,
+                         None if executor else partial(encode_sample, config), written)
+    #Batches arrive in index order and are written by the threads of this process only
+    for batch_rejections, items, telemetry in sample_map(make_batch, repeat(config), repeat(seed), indices,
+                                                         repeat(log is not None)):
+      rejections.update(batch_rejections)
+      if dedup is not None:
+        items = [deduplicated(item, telemetry, executor is not None) for item in items]
+      writer.submit(items, telemetry)
+    writer.close()
+  if index is not None:
+    index.close()
+  if dedup is not None:
+    dedup.close()
+  manifest.save()
+  if log is not None:
+    log.close()
+  print("Rejected plans by reason: " + ", ".join(reason + " " + str(n) for reason, n in sorted(rejections.items())))
+  if repairs:
+    print("Repaired plans by rule: " + ", ".join(rule + " " + str(n) for rule, n in sorted(repairs.items())))
+
+
+def main(argv=None):
+  parser = argument_parser(prog="procgen", description="Generate floor plans with their descriptions in four variants")
+  parser.add_argument("--save-config", help="write the resulting settings to this JSON file and exit")
+  args = parser.parse_args(argv)
+  config = config_from_args(args)
+  if args.save_config:
+    config.save(args.save_config)
+    return
+  run(config)
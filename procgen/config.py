@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+
+
+#Symbology images shipped with the package
+default_symbology_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbology")
+
+
+def portable_symbology_path(path):
+  #Settings saved before symbology_path defaulted to None hold the absolute path of the shipped images on
+  #the machine that saved them, which become None to find the images of this install
+  if path is not None and (path == default_symbology_path or not os.path.exists(path) and
+                           os.path.normpath(path).split(os.sep)[-2:] == ["procgen", "symbology"]):
+    return None
+  return path
+
+
+@dataclass(frozen=True)
+class Config:
+  ### 0. Procedural generation configuration ###
+  number_of_generations: int = 100
+  ##Canvas
+  min_height: int = 60
+  max_height: int = 120
+  min_width: int = 60
+  max_width: int = 120
+  bg_color: tuple = (255, 255, 255)
+  ##Structure
+  margin: int = 10
+  min_rooms: int = 4
+  max_rooms: int = 9
+  ##Additional elements
+  door_size: int = 4
+  window_size: int = 4
+  outer_door_probability: int = 20
+  inner_door_probability: int = 50
+  window_probability: int = 75
+  ##Final colors
+  horizontal_inner_wall_color: tuple = (125, 125, 125)
+  horizontal_outer_wall_color: tuple = (0, 0, 0)
+  vertical_inner_wall_color: tuple = (125, 125, 125)
+  vertical_outer_wall_color: tuple = (0, 0, 0)
+  horizontal_door_color: tuple = (255, 0, 0)
+  vertical_door_color: tuple = (255, 255, 0)
+  horizontal_window_color: tuple = (0, 0, 255)
+  vertical_window_color: tuple = (0, 255, 255)
+  door_color_name: str = "red"
+  window_color_name: str = "blue"
+  bath_color: tuple = (0, 250, 250)
+  bath_color_name: str = "cyan"
+  kitchen_color: tuple = (250, 0, 250)
+  kitchen_color_name: str = "magenta"
+  living_color: tuple = (250, 250, 0)
+  living_color_name: str = "yellow"
+  ##Symbology images, see window_replacements and door_replacements
+  symbology_path: Optional[str] = None #Folder of the images, None for the ones shipped with the package wherever it is installed
+  ##Rendering
+  render_size: Optional[int] = None #Side in pixels of square images rendered straight from the plan, at least max_width and max_height, None renders 30 pixels per plan pixel
+  render_fit: str = "pad" #With a render size, "pad" fits the whole plan into the square, "crop" fills it and cuts the longer side
+  ##Deduplication
+  dedup_copies: Optional[int] = None #Plans with the same layout fingerprint allowed in output_path, 1 drops all duplicates, None allows any
+  max_attempts: int = 1000 #Attempts at a plan number before the run stops with an error naming their rejection reasons
+  ##Plan checks
+  plan_checks: str = "reject" #"reject" drops plans that are in several parts, have no outer door or rooms without a way in,
+                              #"repair" adds the missing doors where it can, "off" keeps all plans
+  ##Output
+  output_format: str = "files" #"files" for folders with one file per variant, "shards" for tar shards, "layouts" for
+                               #arrays to render the images from when reading them, see procgen.store
+  output_path: str = "generations"
+  shard_size: int = 1000 #Samples per tar shard or layout chunk
+  existing_runs: str = "resume" #"resume" continues an unfinished run in output_path, "append" adds a new run after its plans
+  checkpoint_interval: int = 1000 #Plans between checkpoints of the manifest, which also close the current shard or chunk
+  index_name: Optional[str] = "index.sqlite" #SQLite index of all plans in output_path, None disables it
+  png_mode: str = "palette" #"palette" for indexed PNGs, "rgb" for faster but larger ones
+  png_compress_level: int = 6 #zlib level of the PNGs from 0 (fastest) to 9 (smallest)
+  writer_threads: int = 2 #Threads that encode and write plans while the next ones are generated
+  writer_queue_size: int = 4 #Batches waiting for the writer threads before generation pauses
+  ##Parallel generation
+  workers: int = 1 #Number of worker processes, 1 generates in this process
+  base_seed: Optional[int] = None #Seed of the whole run, None draws a new one
+  #Rooms grow in lockstep over a batch at about the same cost per step for any batch size, so batches below about
+  #64 plans generate slower than plans one at a time
+  batch_size: int = 1 #Plans every process generates at once, the plans do not depend on it
+  ##Telemetry
+  telemetry_path: Optional[str] = None #JSON lines file with a record of every generated or rejected plan, None disables telemetry
+  telemetry_interval: int = 100 #Plans between summaries of throughput, rejections and stage times
+
+  def __post_init__(self):
+    #Colors may come as lists from files
+    for f in fields(self):
+      value = getattr(self, f.name)
+      if f.type is tuple and not isinstance(value, tuple):
+        object.__setattr__(self, f.name, tuple(value))
+    object.__setattr__(self, "symbology_path", portable_symbology_path(self.symbology_path))
+    if self.plan_checks not in ["reject", "repair", "off"]:
+      raise ValueError("Unknown plan checks " + repr(self.plan_checks))
+    if self.png_mode not in ["palette", "rgb"]:
+      raise ValueError("Unknown PNG mode " + repr(self.png_mode))
+    #The symbology needs at least one pixel per cell of the plan
+    if self.render_size is not None and self.render_size < max(self.max_width, self.max_height):
+      raise ValueError("render_size must be at least the largest canvas side " + str(max(self.max_width, self.max_height)))
+
+  @property
+  def symbology_folder(self):
+    return default_symbology_path if self.symbology_path is None else self.symbology_path
+
+  #Symbology replacements in the order they are applied: color, replacement image, size in pixels
+  #(x, y), flip chance and whether flipping is upside down
+  @property
+  def window_replacements(self):
+    return [
+      (self.horizontal_window_color, os.path.join(self.symbology_folder, "window_horizontal.png"), 120, 30, 0, False),
+      (self.vertical_window_color, os.path.join(self.symbology_folder, "window_vertical.png"), 30, 120, 0, True)]
+
+  @property
+  def door_replacements(self):
+    return [
+      (self.horizontal_door_color, os.path.join(self.symbology_folder, "door_horizontal.png"), 120, 120, 0.5, True),
+      (self.vertical_door_color, os.path.join(self.symbology_folder, "door_vertical.png"), 120, 120, 0.5, False)]
+
+  @classmethod
+  def load(cls, path):
+    #Load a JSON file of settings, all others keep their defaults
+    with open(path) as f:
+      return cls.from_dict(json.load(f))
+
+  @classmethod
+  def from_dict(cls, settings):
+    names = {f.name for f in fields(cls)}
+    unknown = sorted(set(settings) - names)
+    if unknown:
+      raise ValueError("Unknown settings " + ", ".join(unknown))
+    return cls(**settings)
+
+  def to_dict(self):
+    return {f.name: getattr(self, f.name) for f in fields(self)}
+
+  def save(self, path):
+    with open(path, 'w') as f:
+      json.dump(self.to_dict(), f, indent=1)
+
+
+def parse_color(text):
+  return tuple(int(channel) for channel in text.split(","))
+
+
+def parse_optional(parse):
+  def parse_or_none(text):
+    return None if text.lower() == "none" else parse(text)
+  return parse_or_none
+
+
+#How command line values of every setting type are parsed
+parsers = {
+  int: int,
+  float: float,
+  str: str,
+  tuple: parse_color,
+  Optional[int]: parse_optional(int),
+  Optional[str]: parse_optional(str)
+}
+
+
+def argument_parser(**kwargs):
+  #A parser with a flag for every setting, like --min-height 70 or --bg-color 255,255,255,
+  #and --config to load the settings from a JSON file first
+  parser = argparse.ArgumentParser(**kwargs)
+  parser.add_argument("--config", help="JSON file of settings, the flags below override it")
+  group = parser.add_argument_group("settings")
+  for f in fields(Config):
+    group.add_argument("--" + f.name.replace("_", "-"), dest=f.name, type=parsers[f.type],
+                       default=argparse.SUPPRESS, help="default: %s" % (f.default,))
+  return parser
+
+
+def config_from_args(args):
+  #Settings of the parsed arguments on top of the given config file or the defaults
+  config = Config.load(args.config) if args.config else Config()
+  return replace(config, **{f.name: getattr(args, f.name) for f in fields(Config) if hasattr(args, f.name)})
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+
+class FingerprintIndex:
+  #How many plans of every layout fingerprint (see layout_fingerprint) an output path holds, in the SQLite
+  #table fingerprints of path, so that a layout gets at most copies plans across all runs. Plans are added
+  #with their number and only stored by commit(stop) once all plans before stop are written, like the
+  #manifest, so a resumed run sees exactly the fingerprints of the plans it keeps. Only the fingerprints of
+  #uncommitted plans are held in memory, the table stays on disk. Usable from several threads.
+
+  def __init__(self, path, copies):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    self.connection = sqlite3.connect(path, check_same_thread=False)
+    self.connection.execute("CREATE TABLE IF NOT EXISTS fingerprints (fingerprint INTEGER PRIMARY KEY, plans INTEGER)")
+    self.copies = copies
+    self.pending = []
+    self.pending_counts = Counter()
+    self.lock = threading.Lock()
+
+  def count(self, fingerprint):
+    with self.lock:
+      row = self.connection.execute("SELECT plans FROM fingerprints WHERE fingerprint = ?", (fingerprint,)).fetchone()
+      return (0 if row is None else row[0]) + self.pending_counts[fingerprint]
+
+  def allows(self, fingerprint):
+    return self.count(fingerprint) < self.copies
+
+  def add(self, fingerprint, number):
+    with self.lock:
+      self.pending.append((number, fingerprint))
+      self.pending_counts[fingerprint] += 1
+
+  def commit(self, stop=None):
+    #Store the fingerprints of the plans before stop, or all
+    with self.lock:
+      done = [(number, fingerprint) for number, fingerprint in self.pending if stop is None or number < stop]
+      self.pending = [(number, fingerprint) for number, fingerprint in self.pending
+                      if stop is not None and number >= stop]
+      for number, fingerprint in done:
+        self.pending_counts[fingerprint] -= 1
+        if self.pending_counts[fingerprint] == 0:
+          del self.pending_counts[fingerprint]
+        self.connection.execute("INSERT INTO fingerprints VALUES (?, 1) "
+                                "ON CONFLICT (fingerprint) DO UPDATE SET plans = plans + 1", (fingerprint,))
+      self.connection.commit()
+
+  def close(self):
+    self.commit(None)
+    self.connection.close()
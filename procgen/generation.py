@@ -0,0 +1,1339 @@
+import hashlib
+import numpy as np
+import random
+from collections import Counter
+from functools import lru_cache
+from itertools import count
+from time import perf_counter
+from PIL import Image
+from .config import Config
+from .output import encode_plan, encoded_size
+from .kernels import draw_bounds, fill_bounds, paint_span, paint_opening, draw_room_walls, draw_room_walls_batch
+
+
+#Class for keeping room extents
+class Room:
+
+  def __init__(self, ptx, pty, color, label):
+    self.x1 = ptx
+    self.y1 = pty
+    self.x2 = ptx
+    self.y2 = pty
+    self.color = color
+    self.label = label
+
+
+class PlanRecorder:
+  #Records the seconds spent in consecutive stages and statistics of plans into telemetry records,
+  #one dict per plan, or does nothing without records. A stage run for several plans at once counts
+  #as an equal share for each of them.
+
+  def __init__(self, records):
+    self.records = records
+    if records is not None:
+      self.start = perf_counter()
+
+  def lap(self, stage):
+    #End the current stage
+    if self.records is None:
+      return
+    now = perf_counter()
+    for record in self.records:
+      record.setdefault("stages", {})[stage] = (now - self.start) / len(self.records)
+    self.start = now
+
+  def note(self, **values):
+    #Record the same values for every plan
+    if self.records is None:
+      return
+    for record in self.records:
+      record.update(values)
+
+  def note_each(self, **values):
+    #Record one value per plan, given as lists in the order of the plans
+    if self.records is None:
+      return
+    for i, record in enumerate(self.records):
+      record.update({key: value[i] for key, value in values.items()})
+
+
+def grow_rooms(image, rooms, steps, free_labels):
+  #Every pixel that is not one of the free labels (floor and wall) blocks growth,
+  #this includes the seed pixels of all rooms
+  blocked = ~np.isin(image, free_labels)
+
+  #A direction that is blocked once stays blocked, as rooms only ever grow
+  #Directions per room: up, down, left, right
+  growing = [[True, True, True, True] for r in rooms]
+  grown_steps = steps
+  for s in range(0, steps):
+    grown = False
+    for r, g in zip(rooms, growing):
+      #Grow upwards
+      if g[0]:
+        if blocked[r.x1 - 1, r.y1:r.y2 + 1].any():
+          g[0] = False
+        else:
+          r.x1 -= 1
+          blocked[r.x1, r.y1:r.y2 + 1] = True
+          grown = True
+      #Grow downwards
+      if g[1]:
+        if blocked[r.x2 + 1, r.y1:r.y2 + 1].any():
+          g[1] = False
+        else:
+          r.x2 += 1
+          blocked[r.x2, r.y1:r.y2 + 1] = True
+          grown = True
+      #Grow left
+      if g[2]:
+        if blocked[r.x1:r.x2 + 1, r.y1 - 1].any():
+          g[2] = False
+        else:
+          r.y1 -= 1
+          blocked[r.x1:r.x2 + 1, r.y1] = True
+          grown = True
+      #Grow right
+      if g[3]:
+        if blocked[r.x1:r.x2 + 1, r.y2 + 1].any():
+          g[3] = False
+        else:
+          r.y2 += 1
+          blocked[r.x1:r.x2 + 1, r.y2] = True
+          grown = True
+    #Nothing grew in this step, so nothing will grow in any later step either
+    if not grown:
+      grown_steps = s
+      break
+
+  #Paint the rooms once growth has stopped. Rooms only overlap where seeds coincide,
+  #in which case the later room keeps the pixel, just like the seed painting did
+  for r in rooms:
+    image[r.x1:r.x2 + 1, r.y1:r.y2 + 1] = r.label
+
+  #Steps any room grew in
+  return grown_steps
+
+
+def grow_rooms_batch(images, plan_rooms, plan_steps, free_labels):
+  #grow_rooms for a stack of images with the rooms of every image and its number of steps. In every
+  #step, the first rooms of all images grow at once, then the second ones and so on, which keeps the
+  #order the rooms of every single image grow in. Returns the steps any room grew in, by image.
+  plans = len(plan_rooms)
+  size = max(len(rooms) for rooms in plan_rooms)
+  blocked = ~np.isin(images, free_labels)
+  p = np.arange(plans)
+  rows = np.arange(images.shape[1])
+  cols = np.arange(images.shape[2])
+
+  #Room extents by image and room, missing rooms never grow and only need to stay inside the images
+  x1, y1, x2, y2 = np.ones((4, plans, size), dtype=np.intp)
+  growing = np.zeros((plans, size, 4), dtype=bool)
+  for i, rooms in enumerate(plan_rooms):
+    for k, r in enumerate(rooms):
+      x1[i, k], y1[i, k], x2[i, k], y2[i, k] = r.x1, r.y1, r.x2, r.y2
+    growing[i, :len(rooms)] = True
+
+  steps = np.asarray(plan_steps)
+  grown_steps = np.zeros(plans, dtype=int)
+  for s in range(0, steps.max()):
+    growing[steps == s] = False
+    grown = np.zeros(plans, dtype=bool)
+    #Images whose room at every position is still growing
+    active = [np.flatnonzero(growing[:, k].any(axis=1)) for k in range(0, size)]
+    if not any(len(i) for i in active):
+      #Nothing grows any more
+      break
+    for k, i in enumerate(active):
+      if len(i) == 0:
+        continue
+      g = growing[i, k]
+      pi = p[i]
+      #Grow upwards and downwards, the rows checked are never the ones the other direction grows into
+      across = (cols >= y1[i, k, np.newaxis]) & (cols <= y2[i, k, np.newaxis])
+      hit = (blocked[np.concatenate([pi, pi]), np.concatenate([x1[i, k] - 1, x2[i, k] + 1])]
+             & np.concatenate([across, across])).any(axis=1)
+      g[:, 0] &= ~hit[:len(i)]
+      g[:, 1] &= ~hit[len(i):]
+      x1[i, k] -= g[:, 0]
+      x2[i, k] += g[:, 1]
+      blocked[pi[g[:, 0]], x1[i[g[:, 0]], k]] |= across[g[:, 0]]
+      blocked[pi[g[:, 1]], x2[i[g[:, 1]], k]] |= across[g[:, 1]]
+      #Grow left and right along the rows the room covers now
+      along = (rows >= x1[i, k, np.newaxis]) & (rows <= x2[i, k, np.newaxis])
+      hit = (blocked[np.concatenate([pi, pi]), :, np.concatenate([y1[i, k] - 1, y2[i, k] + 1])]
+             & np.concatenate([along, along])).any(axis=1)
+      g[:, 2] &= ~hit[:len(i)]
+      g[:, 3] &= ~hit[len(i):]
+      y1[i, k] -= g[:, 2]
+      y2[i, k] += g[:, 3]
+      blocked[pi[g[:, 2]], :, y1[i[g[:, 2]], k]] |= along[g[:, 2]]
+      blocked[pi[g[:, 3]], :, y2[i[g[:, 3]], k]] |= along[g[:, 3]]
+      growing[i, k] = g
+      grown[i] |= g.any(axis=1)
+    grown_steps += grown
+
+  #Paint the rooms once growth has stopped, in the same order as grow_rooms
+  for i, rooms in enumerate(plan_rooms):
+    for k, r in enumerate(rooms):
+      r.x1, r.y1, r.x2, r.y2 = int(x1[i, k]), int(y1[i, k]), int(x2[i, k]), int(y2[i, k])
+      images[i, r.x1:r.x2 + 1, r.y1:r.y2 + 1] = r.label
+
+  return grown_steps.tolist()
+
+
+def scan_wall(stops, nodes_hit, outer, start, carry):
+  #Walk along a wall from a node until the first background pixel or node. Returns the length of the
+  #edge if a node ends it (or None), and whether the last pixel walked over was an outer wall, which
+  #types the edge. Without any pixel walked over, the type is carried over from the previous walk.
+  walk = stops[start:]
+  if not walk.any():
+    #Walked to the border of the image
+    return None, outer[-1] if len(walk) > 0 else carry
+  stop = np.argmax(walk)
+  if stop > 0:
+    carry = outer[start + stop - 1]
+  return (int(stop) + 1 if nodes_hit[start + stop] else None), carry
+
+
+class WallGraph:
+  #Walls between wall intersection points (nodes) as edges of a start node, length, direction and
+  #inner or outer kind, in the order they were found, and the rooms that share a wall
+
+  def __init__(self, nodes, edges, adjacency):
+    self.nodes = nodes
+    self.edges = edges
+    self.adjacency = adjacency
+
+  def edges_of(self, direction, kind):
+    return [(n, length) for n, length, d, k in self.edges if d == direction and k == kind]
+
+  def to_dict(self):
+    return {
+      "nodes": [list(n) for n in sorted(self.nodes)],
+      "edges": [{"start": list(n), "length": length, "direction": d, "kind": k} for n, length, d, k in self.edges],
+      "adjacency": self.adjacency
+    }
+
+
+def room_adjacency(rooms):
+  #Rooms grow until they touch, so neighbors share the wall along the row below the upper room
+  #or the column right of the left room
+  adjacency = []
+  for i, a in enumerate(rooms):
+    for j, b in enumerate(rooms):
+      if a.x2 + 1 == b.x1 and min(a.y2, b.y2) >= max(a.y1, b.y1):
+        adjacency.append({"rooms": [i, j], "direction": "horizontal", "line": a.x2,
+                          "start": max(a.y1, b.y1), "end": min(a.y2, b.y2)})
+      if a.y2 + 1 == b.y1 and min(a.x2, b.x2) >= max(a.x1, b.x1):
+        adjacency.append({"rooms": [i, j], "direction": "vertical", "line": b.y1,
+                          "start": max(a.x1, b.x1), "end": min(a.x2, b.x2)})
+  return adjacency
+
+
+def extract_wall_graph(image, nodes, rooms, bg_label, outer_wall_label):
+  #For every wall intersection point walk downwards and right along the walls, to collect all walls
+  #in the image and distinguish them by type and direction. Nodes are looked up in a grid instead of
+  #searching the node set for every pixel, and every walk is a single scan of a row or column.
+  is_node = np.zeros(image.shape, dtype=bool)
+  for n in nodes:
+    is_node[n] = True
+  is_bg = image == bg_label
+  is_outer = image == outer_wall_label
+  stops = is_bg | is_node
+
+  edges = []
+  for n in nodes:
+    x, y = n
+    #Check for edge in lower direction
+    length, carry = scan_wall(stops[:, y], is_node[:, y], is_outer[:, y], x + 1, False)
+    if length is not None:
+      edges.append((n, length, "vertical", "outer" if carry else "inner"))
+    #Check for edge in right direction, a walk without pixels keeps the type of the last one
+    length, carry = scan_wall(stops[x], is_node[x], is_outer[x], y + 1, carry)
+    if length is not None:
+      edges.append((n, length, "horizontal", "outer" if carry else "inner"))
+
+  return WallGraph(nodes, edges, room_adjacency(rooms))
+
+
+def building_size(horizontal_bounds, horizontal_max, vertical_bounds, vertical_max):
+  horizontal_lower_third = horizontal_max / 3
+  horizontal_upper_third = horizontal_max * 2 / 3
+  vertical_lower_third = vertical_max / 3
+  vertical_upper_third = vertical_max * 2 / 3
+  
+  if horizontal_bounds < horizontal_lower_third and vertical_bounds < vertical_lower_third:
+    return "small "
+  elif horizontal_bounds < horizontal_upper_third and vertical_bounds < vertical_upper_third:
+    return ""
+  else:
+    return "large "
+	
+def image_contains_color(image_array, tolerance=0):
+    #A band of rows at a time, the differences of a whole image take more memory than the image
+    for start in range(0, len(image_array), 256):
+      band = image_array[start:start + 256]
+      diff = np.abs(band[..., :-1] - band[..., 1:])
+      max_diff = np.max(diff, axis=-1)
+      if np.any(max_diff > tolerance):
+        return True
+    return False
+
+
+#Symbology sprites per process, see load_sprite
+sprite_cache = {}
+
+
+def load_sprite(replacement_image, channels, up_down):
+  # Load a symbology sprite once per process, together with its flipped variant
+  # and the masks of their black pixels
+  key = (replacement_image, channels, up_down)
+  if key not in sprite_cache:
+    sprite_img = Image.open(replacement_image)
+    if channels == 3:
+      sprite_img = sprite_img.convert('RGB')
+    else:
+      sprite_img = sprite_img.convert('RGBA')
+    if up_down:
+      flipped_img = sprite_img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    else:
+      flipped_img = sprite_img.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+    # Index 0 is the sprite as is, index 1 its flipped variant
+    sprites = np.stack([np.array(sprite_img), np.array(flipped_img)])
+    black_pixels_masks = np.all(sprites[..., :3] == 0, axis=-1)
+    sprites.flags.writeable = False
+    black_pixels_masks.flags.writeable = False
+    sprite_cache[key] = (sprites, black_pixels_masks)
+  return sprite_cache[key]
+
+
+def color_mask(image_array, color):
+  # Compare channel by channel, which is much faster than np.all over the last axis
+  mask = image_array[..., 0] == color[0]
+  for channel in range(1, len(color)):
+    mask &= image_array[..., channel] == color[channel]
+  return mask
+
+
+def find_rectangles(mask):
+  # A pixel is the top-left corner of a rectangle if it is set in the mask,
+  # but neither the pixel above nor the pixel to the left is
+  corners = mask.copy()
+  corners[1:] &= ~mask[:-1]
+  corners[:, 1:] &= ~mask[:, :-1]
+
+  # Corners in row-major order
+  y, x = np.nonzero(corners)
+  return x, y
+
+
+@lru_cache(maxsize=None)
+def scaled_sprite(replacement_image, up_down, flipped, height, width):
+  # A sprite (or its flipped variant) and the share of black pixels of every pixel,
+  # averaged over the area each pixel covers when resized to height x width pixels
+  sprites, black_pixels_masks = load_sprite(replacement_image, 3, up_down)
+  sprite = np.array(Image.fromarray(sprites[flipped]).resize((width, height), Image.Resampling.BOX))
+  black = np.array(Image.fromarray(black_pixels_masks[flipped].astype(np.float32)).resize(
+    (width, height), Image.Resampling.BOX))
+  sprite.flags.writeable = False
+  black.flags.writeable = False
+  return sprite, black
+
+
+class CellFit:
+  # Renders a plan of rows x columns pixels (cells) into an image of row_pixels x column_pixels pixels
+  # with scale pixels per cell. Cell i covers the pixels from bound(i) to bound(i + 1), with all cells
+  # centered in the image.
+
+  def __init__(self, rows, columns, scale, row_pixels, column_pixels):
+    self.scale = scale
+    self.row_pixels = row_pixels
+    self.column_pixels = column_pixels
+    self.row_offset = (row_pixels - self.bound(rows, 0)) // 2
+    self.column_offset = (column_pixels - self.bound(columns, 0)) // 2
+    self.row_cells = self.cells(rows, self.row_offset, row_pixels)
+    self.column_cells = self.cells(columns, self.column_offset, column_pixels)
+    # The black pixels of the stamps found so far, with their top left pixel at scale_factor, see find_stamps
+    self.blackened = []
+
+  @classmethod
+  def native(cls, rows, columns, scale_factor):
+    # scale_factor pixels per cell, every cell becomes a square of pixels
+    return cls(rows, columns, scale_factor, rows * scale_factor, columns * scale_factor)
+
+  @classmethod
+  def square(cls, rows, columns, size, fit):
+    # A square of size pixels: "pad" fits all cells and fills the rest, "crop" fills the square and cuts
+    # the longer side
+    if fit not in ["pad", "crop"]:
+      raise ValueError("Unknown fit " + repr(fit))
+    if size < (max(rows, columns) if fit == "pad" else min(rows, columns)):
+      raise ValueError("A size of " + str(size) + " pixels gives less than one pixel per cell")
+    return cls(rows, columns, size / (max(rows, columns) if fit == "pad" else min(rows, columns)), size, size)
+
+  def bound(self, cell, offset):
+    return offset + int(np.floor(cell * self.scale + 0.5))
+
+  def cells(self, count, offset, pixels):
+    # The cell of every pixel along an axis, count for the pixels outside of all cells
+    bounds = offset + np.floor(np.arange(count + 1) * self.scale + 0.5).astype(np.intp)
+    cells = np.searchsorted(bounds, np.arange(pixels), side="right") - 1
+    cells[(cells < 0) | (cells >= count)] = count
+    return cells
+
+  def scale_image(self, image_array, fill):
+    # Nearest-neighbor scaling, pixels outside of all cells get the fill color
+    rows, columns, channels = image_array.shape
+    filled = np.empty((rows + 1, columns + 1, channels), image_array.dtype)
+    filled[:rows, :columns] = image_array
+    filled[rows] = fill
+    filled[:, columns] = fill
+    return np.take(np.take(filled, self.column_cells, axis=1), self.row_cells, axis=0)
+
+  def pixel_bound(self, pixel, offset, scale_factor):
+    # The first pixel of the image in pixel of the plan scaled by scale_factor, bound for the first
+    # pixel of a cell
+    cell, rest = divmod(pixel, scale_factor)
+    start = self.bound(cell, offset)
+    return start + (rest * (self.bound(cell + 1, offset) - start) + scale_factor - 1) // scale_factor
+
+  def scaled_pixels(self, cells, offset, count, scale_factor):
+    # The pixel of the plan scaled by scale_factor under every pixel along an axis, count * scale_factor
+    # for the pixels outside of all cells. At scale_factor pixels per cell, that is the pixel itself.
+    inside = np.minimum(cells, count - 1)
+    start = offset + np.floor(inside * self.scale + 0.5).astype(np.intp)
+    stop = offset + np.floor((inside + 1) * self.scale + 0.5).astype(np.intp)
+    pixels = inside * scale_factor + (np.arange(len(cells)) - start) * scale_factor // (stop - start)
+    pixels[cells == count] = count * scale_factor
+    return pixels
+
+  def painted_mask(self, mask, scale_factor):
+    # The mask of a color among the cells scaled by scale_factor without the black pixels earlier stamps
+    # painted over it, with an empty row and column after it. None if they did not paint over the color,
+    # then its rectangles are those among the cells.
+    pixel_mask = None
+    rows, columns = mask.shape
+    for row, column, black in self.blackened:
+      top, left = max(row, 0), max(column, 0)
+      bottom = min(row + black.shape[0], rows * scale_factor)
+      right = min(column + black.shape[1], columns * scale_factor)
+      if top >= bottom or left >= right:
+        continue
+      black = black[top - row:bottom - row, left - column:right - column]
+      if pixel_mask is None:
+        cell_rows, cell_columns = np.arange(top, bottom) // scale_factor, np.arange(left, right) // scale_factor
+        if not (mask[cell_rows[:, np.newaxis], cell_columns] & black).any():
+          continue
+        pixel_mask = np.zeros((rows * scale_factor + 1, columns * scale_factor + 1), dtype=bool)
+        pixel_mask[:-1, :-1] = np.repeat(np.repeat(mask, scale_factor, axis=0), scale_factor, axis=1)
+      pixel_mask[top:bottom, left:right] &= ~black
+    return pixel_mask
+
+  def find_stamps(self, cells, color, replacement_image, x_size, y_size, flip_chance, up_down, scale_factor,
+                  rng=random):
+    # Find the rectangles of a color and plan a stamp of the replacement image (made for scale_factor)
+    # onto every one, flipped with the given chance. The rectangles are those of the color on the plan
+    # scaled by scale_factor after the black pixels of the earlier stamps painted over it, in row-major
+    # order of their top left pixels: those of the cells, or those of the scaled pixels where black pixels
+    # of earlier stamps split them. Flipped stamps are anchored at the far end of the rectangle. The
+    # replaced cells are cleared for the rectangles of later colors. A stamp is the window of the image
+    # it covers, which of its pixels belong to the rectangle, and the sprite resized to the window with
+    # the black share of its pixels, see apply_stamps.
+    mask = color_mask(cells, color)
+    pixel_mask = self.painted_mask(mask, scale_factor)
+    if pixel_mask is None:
+      x, y = find_rectangles(mask)
+      x, y = x * scale_factor, y * scale_factor
+      padded_mask = np.pad(mask, ((0, 1), (0, 1)))
+      row_lookup, column_lookup = self.row_cells, self.column_cells
+    else:
+      x, y = find_rectangles(pixel_mask)
+      padded_mask = pixel_mask
+      row_lookup = self.scaled_pixels(self.row_cells, self.row_offset, mask.shape[0], scale_factor)
+      column_lookup = self.scaled_pixels(self.column_cells, self.column_offset, mask.shape[1], scale_factor)
+    flipped = [int(rng.random() < flip_chance) for i in range(len(x))]
+    sprites, black_pixels_masks = load_sprite(replacement_image, 3, up_down)
+    stamps = []
+    for row, column, flip in zip(y.tolist(), x.tolist(), flipped):
+      if flip and up_down:
+        row -= y_size - scale_factor
+      elif flip:
+        column -= x_size - scale_factor
+      self.blackened.append((row, column, black_pixels_masks[flip]))
+      # Clear the replaced cells (to black, which is no opening color)
+      cell_window = (slice(max(row // scale_factor, 0), -(-(row + y_size) // scale_factor)),
+                     slice(max(column // scale_factor, 0), -(-(column + x_size) // scale_factor)))
+      cells[cell_window][mask[cell_window]] = 0
+      top = self.pixel_bound(row, self.row_offset, scale_factor)
+      bottom = self.pixel_bound(row + y_size, self.row_offset, scale_factor)
+      left = self.pixel_bound(column, self.column_offset, scale_factor)
+      right = self.pixel_bound(column + x_size, self.column_offset, scale_factor)
+      sprite, black = scaled_sprite(replacement_image, up_down, flip, bottom - top, right - left)
+      # Cut the sprite to the image
+      inside = (slice(max(-top, 0), max(self.row_pixels - top, 0)),
+                slice(max(-left, 0), max(self.column_pixels - left, 0)))
+      window = (slice(max(top, 0), max(bottom, 0)), slice(max(left, 0), max(right, 0)))
+      replaced = padded_mask[row_lookup[window[0], np.newaxis], column_lookup[window[1]]]
+      stamps.append((window, replaced, sprite[inside], black[inside]))
+    return stamps
+
+
+def apply_stamps(image_array, stamps):
+  # Stamp sprites in the order they are given: the pixels of their rectangles get the sprite, all other
+  # pixels are darkened by its black share. At the scale the sprites are made for, that replaces
+  # exactly the rectangles and the black pixels of the sprites.
+  for window, replaced, sprite, black in stamps:
+    darkened = (image_array[window] * (1 - black[..., np.newaxis])).astype(image_array.dtype)
+    image_array[window] = np.where(replaced[..., np.newaxis], sprite, darkened)
+
+
+def dilate(mask, up, down, left, right):
+  # Grow a mask by the given number of pixels in every direction
+  grown = mask.copy()
+  for d in range(1, up + 1):
+    grown[:-d] |= mask[d:]
+  for d in range(1, down + 1):
+    grown[d:] |= mask[:-d]
+  rows = grown.copy()
+  for d in range(1, left + 1):
+    grown[:, :-d] |= rows[:, d:]
+  for d in range(1, right + 1):
+    grown[:, d:] |= rows[:, :-d]
+  return grown
+
+
+@lru_cache(maxsize=None)
+def black_blocks(replacement_image, up_down, scale_factor):
+  # Which blocks of scale_factor pixels of a replacement image (and its flipped variant) are
+  # fully black, and whether any such square is fully black when not aligned to the blocks
+  sprites, black_pixels_masks = load_sprite(replacement_image, 3, up_down)
+  n, y_size, x_size = black_pixels_masks.shape
+  aligned = black_pixels_masks.reshape(n, y_size // scale_factor, scale_factor,
+                                       x_size // scale_factor, scale_factor).all(axis=(2, 4))
+  windows = np.lib.stride_tricks.sliding_window_view(black_pixels_masks, (scale_factor, scale_factor), axis=(1, 2))
+  return aligned, bool(windows.all(axis=(-2, -1)).any())
+
+
+def validate_symbology(image_array, replacements, scale_factor):
+  # Predict on the low-resolution image whether the symbology plan would still contain color
+  # after the replacements (color, replacement image, x size, y size, flip chance, up down)
+  # are stamped onto it at scale_factor pixels per cell, in that order, see CellFit.find_stamps. Only certain failures are reported,
+  # anything that depends on the random flips or on replacements interfering with each
+  # other is left to the check of the final image.
+  height, width = image_array.shape[:2]
+  colored = ((image_array[..., 0] != image_array[..., 1])
+             | (image_array[..., 1] != image_array[..., 2]))
+  masks = [color_mask(image_array, r[0]) for r in replacements]
+  openings = np.logical_or.reduce(masks)
+
+  # Pixels covered by earlier replacements, pixels a replacement image could turn fully black,
+  # and opening pixels that are certainly left over
+  touched = np.zeros((height, width), dtype=bool)
+  blackened = np.zeros((height, width), dtype=bool)
+  uncovered = np.zeros((height, width), dtype=bool)
+  for mask, (color, replacement_image, x_size, y_size, flip_chance, up_down) in zip(masks, replacements):
+    x_blocks, y_blocks = x_size // scale_factor, y_size // scale_factor
+    aligned_black, any_black = black_blocks(replacement_image, up_down, scale_factor)
+    flips = [f for f, possible in ((0, flip_chance < 1), (1, flip_chance > 0)) if possible]
+
+    # Rectangles found in the scaled image are those of the low-resolution image, except in and
+    # just below or right of pixels of this color that earlier replacements partly painted over.
+    # There, a replacement can start at any pixel.
+    changed = dilate(mask & touched, 0, 1, 0, 1)
+    covered = dilate(changed, y_blocks - 1 if up_down and 1 in flips else 0, y_blocks,
+                     x_blocks - 1 if not up_down and 1 in flips else 0, x_blocks)
+    if any_black:
+      blackened |= covered
+    x, y = find_rectangles(mask)
+    for x_start, y_start in zip(x, y):
+      for f in flips:
+        window_y, window_x = y_start, x_start
+        if f and up_down:
+          window_y -= y_blocks - 1
+        elif f:
+          window_x -= x_blocks - 1
+        if window_y < 0 or window_x < 0 or window_y + y_blocks > height or window_x + x_blocks > width:
+          return "opening_out_of_bounds"
+        window = (slice(window_y, window_y + y_blocks), slice(window_x, window_x + x_blocks))
+        covered[window] = True
+        blackened[window] |= aligned_black[f]
+    uncovered |= mask & ~touched & ~covered
+    touched |= covered
+
+  # Colors that are not replaced, like unresolved wall nodes
+  if (colored & ~openings & ~blackened).any():
+    return "stray_color"
+  # Opening pixels no replacement image covers, where openings run into each other
+  if (uncovered & ~blackened).any():
+    return "overlapping_openings"
+  return None
+
+
+def replace_color(np_image, old_color, new_color):
+    # Create a boolean mask that is True where the old_color is found in the image
+    color_mask = np.all(np_image == old_color, axis=-1)
+
+    # Replace old_color with new_color using the mask
+    np_image[color_mask] = new_color
+
+    return np_image
+
+def create_description(config, size, kitchen, bath, rooms, windows, doors, room_semantics, symbology):
+  #Set colors
+  if room_semantics:
+    kc = config.kitchen_color_name
+    bc = config.bath_color_name
+    lc = config.living_color_name
+    wc = config.window_color_name
+    dc = config.door_color_name
+  else:
+    kc = "white"
+    bc = "white"
+    lc = "white"
+  if symbology:
+    wc = "symbols"
+    dc = "symbols"
+  else:
+    wc = config.window_color_name
+    dc = config.door_color_name
+  #Base
+  desc = "(floor plan of a " + size + " building with black walls), "
+  #Rooms
+  #Kitchens
+  if kitchen > 6:
+    desc += "(many "
+  elif kitchen > 0:
+    desc += "(few "
+  else:
+    desc += "(no "
+  desc += str(kitchen) + " kitchens " + kc + "), "
+  #Baths
+  if bath > 6:
+    desc += "(many "
+  elif bath > 0:
+    desc += "(few "
+  else:
+    desc += "(no "
+  desc += str(bath) + " bathrooms " + bc + "), "
+  #Rooms
+  if rooms > 6:
+    desc += "(many "
+  elif rooms > 0:
+    desc += "(few "
+  else:
+    desc += "(no "
+  desc += str(rooms) + " rooms " + lc + "), "
+  #Windows
+  if windows > 6:
+    desc += "(many "
+  elif windows > 0:
+    desc += "(few "
+  else:
+    desc += "(no "
+  desc += str(windows) + " windows " + wc + "), "
+  #Doors
+  if doors > 6:
+    desc += "(many "
+  elif doors > 0:
+    desc += "(few "
+  else:
+    desc += "(no "
+  desc += str(doors) + " doors " + dc + ") "
+
+  return desc
+
+
+#Pixels per pixel of the plan in the rendered images, the symbology images are made for it
+scale_factor = 30
+
+#Construction labels. Plans are built on a map of one label per pixel, which is only turned into
+#colors by a palette (one color per label) when the variants are rendered
+bg_label = 0
+floor_label = 1
+wall_label = 2
+outer_wall_label = 3
+node_label = 4
+horizontal_inner_wall_label = 5
+vertical_inner_wall_label = 6
+horizontal_outer_wall_label = 7
+vertical_outer_wall_label = 8
+horizontal_door_label = 9
+vertical_door_label = 10
+horizontal_window_label = 11
+vertical_window_label = 12
+bath_label = 13
+kitchen_label = 14
+living_label = 15
+room_label = 16 #Rooms are labeled room_label + their number while they grow
+
+
+def label_colors(config):
+  #Colors of all labels but the rooms
+  return [
+    config.bg_color,
+    (255, 255, 0), #Floor
+    (0, 0, 255), #Wall
+    (255, 0, 0), #Outer wall
+    (0, 255, 0), #Node
+    config.horizontal_inner_wall_color,
+    config.vertical_inner_wall_color,
+    config.horizontal_outer_wall_color,
+    config.vertical_outer_wall_color,
+    config.horizontal_door_color,
+    config.vertical_door_color,
+    config.horizontal_window_color,
+    config.vertical_window_color,
+    config.bath_color,
+    config.kitchen_color,
+    config.living_color]
+
+
+def label_dtype(config):
+  return np.uint8 if room_label + config.max_rooms <= 256 else np.uint16
+
+
+def layout_fingerprint(room_img):
+  #A 64 bit hash of a plan from its labels with the rooms filled with their semantic labels, the same for
+  #all plans that only differ in room colors, the orientation labels of walls and openings, the canvas
+  #around the building, or by flips and rotations: the smallest hash of all eight orientations
+  labels = room_img.astype(np.uint8)
+  labels[room_img >= room_label] = room_label
+  for vertical, horizontal in [(vertical_inner_wall_label, horizontal_inner_wall_label),
+                               (vertical_outer_wall_label, horizontal_outer_wall_label),
+                               (vertical_door_label, horizontal_door_label),
+                               (vertical_window_label, horizontal_window_label)]:
+    labels[labels == vertical] = horizontal
+  x, y = np.nonzero(labels != bg_label)
+  if len(x):
+    labels = labels[x.min():x.max() + 1, y.min():y.max() + 1]
+  hashes = []
+  for flipped in [labels, labels[::-1]]:
+    for k in range(4):
+      oriented = np.ascontiguousarray(np.rot90(flipped, k))
+      digest = hashlib.blake2b(np.array(oriented.shape, np.int64).tobytes() + oriented.tobytes(), digest_size=8)
+      hashes.append(int.from_bytes(digest.digest(), "little", signed=True))
+  return min(hashes)
+
+
+def reachable_rooms(connections, start):
+  #The rooms reachable from start over the given pairs of connected rooms
+  reached = {start}
+  frontier = [start]
+  while frontier:
+    r = frontier.pop()
+    for a, b in connections:
+      for here, there in [(a, b), (b, a)]:
+        if here == r and there not in reached:
+          reached.add(there)
+          frontier.append(there)
+  return reached
+
+
+def door_connections(img, room_map):
+  #The pairs of rooms, numbered from 1 and 0 for the outside, on both sides of the doors
+  x, y = np.nonzero(img == horizontal_door_label)
+  pairs = set(zip(room_map[x - 1, y].tolist(), room_map[x + 1, y].tolist()))
+  x, y = np.nonzero(img == vertical_door_label)
+  pairs.update(zip(room_map[x, y - 1].tolist(), room_map[x, y + 1].tolist()))
+  return {(a, b) for a, b in pairs if a >= 0 and b >= 0 and a != b}
+
+
+def opening_fits(img, line, center, size, horizontal, wall):
+  #Whether paint_opening would only paint over wall pixels of the given label
+  start, stop = center - size // 2, center + size // 2
+  pixels = img[line, start:stop] if horizontal else img[start:stop, line]
+  return bool(np.all(pixels == wall))
+
+
+def add_exterior_door(config, img, graph):
+  #Add a door in the middle of the longest outer wall it fits into, where step 5 would have put it
+  edges = [(length, n, True) for n, length in graph.edges_of("horizontal", "outer")] + \
+          [(length, n, False) for n, length in graph.edges_of("vertical", "outer")]
+  for length, n, horizontal in sorted(edges, key=lambda e: -e[0]):
+    line, start = (n[0], n[1]) if horizontal else (n[1], n[0])
+    wall, door = ((horizontal_outer_wall_label, horizontal_door_label) if horizontal
+                  else (vertical_outer_wall_label, vertical_door_label))
+    if length > config.door_size and opening_fits(img, line, start + length // 2, config.door_size, horizontal, wall):
+      paint_opening(img, line, start + length // 2, config.door_size, horizontal, door)
+      return True
+  return False
+
+
+def add_inner_door(config, img, adjacency, reached):
+  #Add a door in the middle of the first wall a reachable room shares with an unreachable one
+  for entry in adjacency:
+    a, b = entry["rooms"]
+    if (a + 1 in reached) == (b + 1 in reached):
+      continue
+    horizontal = entry["direction"] == "horizontal"
+    #Shared rows start after the node of the upper wall, shared columns end at the node of the lower wall
+    length = entry["end"] - entry["start"]
+    center = entry["start"] + (1 if horizontal else 0) + length // 2
+    wall, door = ((horizontal_inner_wall_label, horizontal_door_label) if horizontal
+                  else (vertical_inner_wall_label, vertical_door_label))
+    if length > config.door_size and opening_fits(img, entry["line"], center, config.door_size, horizontal, wall):
+      paint_opening(img, entry["line"], center, config.door_size, horizontal, door)
+      return True
+  return False
+
+
+def check_plan(config, img, rooms, graph):
+  #Check that the building is in one piece, has a door to the outside and that every room can be reached
+  #from there through doors. Returns the first rule the plan breaks, or None, and the rules repaired on the
+  #way: with plan_checks "repair", missing doors are added on an outer wall or on a wall between a reachable
+  #and an unreachable room, once per door. Repairs draw no random numbers.
+  repairs = []
+  walls = {(a + 1, b + 1) for a, b in (entry["rooms"] for entry in graph.adjacency)}
+  if len(reachable_rooms(walls, 1)) < len(rooms):
+    return "disconnected_building", repairs
+  room_map = np.where(img == bg_label, 0, -1).astype(np.int16)
+  for i, r in enumerate(rooms):
+    fill_bounds(room_map, r.x1, r.y1 + 1, r.x2 - 1, r.y2, i + 1)
+  repair = config.plan_checks == "repair"
+  connections = door_connections(img, room_map)
+  if not any(0 in pair for pair in connections):
+    if not (repair and add_exterior_door(config, img, graph)):
+      return "no_exterior_door", repairs
+    repairs.append("no_exterior_door")
+    connections = door_connections(img, room_map)
+  reached = reachable_rooms(connections, 0)
+  while len(reached) <= len(rooms):
+    if not (repair and add_inner_door(config, img, graph.adjacency, reached)):
+      return "unreachable_room", repairs
+    repairs.append("unreachable_room")
+    reached = reachable_rooms(door_connections(img, room_map), 0)
+  return None, repairs
+
+
+def plan_random(seed, index, attempt):
+  #Every attempt at every sample index gets its own random stream, derived from the base seed
+  #like SeedSequence(seed).spawn(...)[index].spawn(...)[attempt], so a sample is reproducible
+  #no matter how many workers generate the run and in which order
+  seed_sequence = np.random.SeedSequence(seed, spawn_key=(index, attempt))
+  return random.Random(int.from_bytes(seed_sequence.generate_state(4).tobytes(), "little"))
+
+
+def draw_layout(config, rng):
+  #Make the random choices of steps 1 and 2, none of which depend on the drawn image: the size of the
+  #image, the seeds of the rooms with their colors and which rooms are eliminated after growing
+
+  #Establish bounds
+  height = rng.randrange(config.min_height, config.max_height)
+  width = rng.randrange(config.min_width, config.max_width)
+  bounds_height = height - config.margin * 2
+  bounds_width = width - config.margin * 2
+
+  #Randomly generate starting points within the bounds
+  room_nr = rng.randrange(config.min_rooms, config.max_rooms)
+  rooms = []
+  room_colors = []
+  for r in range(0, room_nr):
+    room_color = [
+      rng.randrange(0, 255),
+      rng.randrange(0, 255),
+      rng.randrange(0, 255)
+    ]
+    pt_x = rng.randrange(config.margin + 1, config.margin + bounds_width - 1)
+    pt_y = rng.randrange(config.margin + 1, config.margin + bounds_height - 1)
+    rooms.append(Room(pt_x, pt_y, room_color, room_label + r))
+    room_colors.append(room_color)
+
+  #Eliminate rooms at random to create non-square building structures
+  deleted = [rng.randint(0, 100) < 15 for r in rooms]
+  return width, height, rooms, room_colors, deleted
+
+
+def generate_plan(config, rng, rejections, record=None, allow=None):
+  #Pass a dict as record to collect telemetry of the plan in it, and a function as allow to reject plans
+  #whose layout fingerprint it returns False for
+  recorder = PlanRecorder(None if record is None else [record])
+
+  #########################################################
+  ### 1. Generate and draw basic bounds of the building ###
+
+  width, height, rooms, room_colors, deleted = draw_layout(config, rng)
+  bounds_height = height - config.margin * 2
+  bounds_width = width - config.margin * 2
+
+  #Generate image background
+  img = np.full((width, height), bg_label, dtype=label_dtype(config))
+
+  #Draw building bounds
+  draw_bounds(img, config.margin, config.margin, config.margin + bounds_height,
+              config.margin + bounds_width, wall_label)
+  fill_bounds(img, config.margin + 1, config.margin + 1, config.margin + bounds_width - 1,
+              config.margin + bounds_height - 1, floor_label)
+  recorder.lap("bounds")
+
+  ###############################################################
+  ### 2. Generate room extents through growth-based algorithm ###
+
+  #Draw the starting points, later rooms win where they coincide
+  for r in rooms:
+    img[r.x1, r.y1] = r.label
+
+  #Growth-based algorithm
+  steps = height - config.margin  #The maximum amount of pixels a room can grow
+  grown_steps = grow_rooms(img, rooms, steps, [floor_label, wall_label])
+
+  #Pixels that were not grown over keep the floor label. They used to be recolored to background by
+  #comparing every single channel of the image to the whole floor color, which never matched, so
+  #recoloring them now would change every plan.
+
+  #Eliminate rooms
+  for r, d in zip(rooms, deleted):
+    if d:
+      fill_bounds(img, r.x1, r.y1, r.x2, r.y2, bg_label)
+  rooms = [r for r, d in zip(rooms, deleted) if not d]
+  recorder.lap("growth")
+  recorder.note(width=width, height=height, seeded_rooms=len(deleted), steps=steps, grown_steps=grown_steps,
+                deleted_rooms=sum(deleted))
+
+  ####################################################
+  ### 3. Draw walls along the borders of the rooms ###
+
+  #Draw inner and outer walls, make sure that they are one pixel thick
+  for r in rooms:
+    draw_room_walls(img, r, bg_label, outer_wall_label, wall_label)
+  recorder.lap("walls")
+
+  return finish_plan(config, rng, img, width, height, rooms, room_colors, rejections, recorder, allow)
+
+
+def generate_plans(config, rngs, rejections, records=None, allow=None):
+  #Generate a batch of plans, one per random stream, like generate_plan does for each of them. Steps 1
+  #to 3 run for the whole batch at once on a stack of images padded to the largest possible size, the
+  #other steps depend on the topology of every single plan and run per plan on its part of the stack.
+  #Pass a list of dicts, one per random stream, as records to collect telemetry of the plans in them.
+  recorder = PlanRecorder(records)
+  layouts = [draw_layout(config, rng) for rng in rngs]
+  widths = np.array([layout[0] for layout in layouts])
+  heights = np.array([layout[1] for layout in layouts])
+  plan_rooms = [layout[2] for layout in layouts]
+
+  #Generate image backgrounds and draw the building bounds of all plans
+  stack = np.full((len(rngs), config.max_width, config.max_height), bg_label, dtype=label_dtype(config))
+  rows = np.arange(config.max_width)[:, np.newaxis]
+  cols = np.arange(config.max_height)
+  bounds_widths = (widths - config.margin * 2)[:, np.newaxis, np.newaxis]
+  bounds_heights = (heights - config.margin * 2)[:, np.newaxis, np.newaxis]
+  stack[(rows >= config.margin) & (rows <= config.margin + bounds_widths)
+        & (cols >= config.margin) & (cols <= config.margin + bounds_heights)] = wall_label
+  stack[(rows > config.margin) & (rows < config.margin + bounds_widths)
+        & (cols > config.margin) & (cols < config.margin + bounds_heights)] = floor_label
+  recorder.lap("bounds")
+
+  #Draw the starting points and grow the rooms of all plans
+  for img, rooms in zip(stack, plan_rooms):
+    for r in rooms:
+      img[r.x1, r.y1] = r.label
+  grown_steps = grow_rooms_batch(stack, plan_rooms, heights - config.margin, [floor_label, wall_label])
+
+  #Eliminate rooms
+  for p, (width, height, rooms, room_colors, deleted) in enumerate(layouts):
+    for r, d in zip(rooms, deleted):
+      if d:
+        fill_bounds(stack[p], r.x1, r.y1, r.x2, r.y2, bg_label)
+    plan_rooms[p] = [r for r, d in zip(rooms, deleted) if not d]
+  recorder.lap("growth")
+  recorder.note_each(width=widths.tolist(), height=heights.tolist(),
+                     seeded_rooms=[len(layout[4]) for layout in layouts], steps=(heights - config.margin).tolist(),
+                     grown_steps=grown_steps, deleted_rooms=[sum(layout[4]) for layout in layouts])
+
+  #Draw inner and outer walls of all plans
+  draw_room_walls_batch(stack, plan_rooms, bg_label, outer_wall_label, wall_label)
+  recorder.lap("walls")
+
+  plans = []
+  for p, (rng, layout, rooms) in enumerate(zip(rngs, layouts, plan_rooms)):
+    width, height, room_colors = layout[0], layout[1], layout[3]
+    plans.append(finish_plan(config, rng, stack[p, :width, :height], width, height, rooms, room_colors, rejections,
+                             PlanRecorder(None if records is None else [records[p]]), allow))
+  return plans
+
+
+def plan_palettes(config, room_colors):
+  #Colors of all labels, the rooms keep their random colors. The colored versions draw vertical
+  #openings in the colors of horizontal ones.
+  palette = np.array(label_colors(config) + room_colors, dtype=np.uint8)
+  cont_palette = replace_color(np.copy(palette), config.vertical_door_color, config.horizontal_door_color)
+  replace_color(cont_palette, config.vertical_window_color, config.horizontal_window_color)
+  return palette, cont_palette
+
+
+def render_plan(config, rng, img, room_img, palette, cont_palette, render_size, render_fit, recorder,
+                variants=None):
+  #Render the versions of a plan from its labels with and without room semantics, the colors of their
+  #labels, and rng for the flips of the symbology. Returns the images by version, None for versions
+  #left out of variants (all by default), and the numbers of windows and doors.
+  width, height = img.shape
+  if variants is None:
+    variants = ["symb", "cont", "symb_room", "cont_room"]
+
+  #The four versions share one scaling of the cells, the room versions only fill the rooms. The rectangles
+  #to replace with symbology are found once on the low resolution symbology plan, and the same stamps
+  #are applied to both symbology versions.
+  if render_size is None:
+    fit = CellFit.native(width, height, scale_factor)
+  else:
+    fit = CellFit.square(width, height, render_size, render_fit)
+  cont_img = fit.scale_image(cont_palette[img], config.bg_color) if "cont" in variants else None
+  cont_room_img = fit.scale_image(cont_palette[room_img], config.bg_color) if "cont_room" in variants else None
+  symb_img = fit.scale_image(palette[img], config.bg_color) if "symb" in variants else None
+  symb_room_img = fit.scale_image(palette[room_img], config.bg_color) if "symb_room" in variants else None
+  recorder.lap("scaling")
+
+  #Windows first, then doors
+  cells = palette[img]
+  window_stamps = [stamp for replacement in config.window_replacements
+                   for stamp in fit.find_stamps(cells, *replacement, scale_factor, rng)]
+  door_stamps = [stamp for replacement in config.door_replacements
+                 for stamp in fit.find_stamps(cells, *replacement, scale_factor, rng)]
+  windows, doors = len(window_stamps), len(door_stamps)
+  for image_array in [symb_img, symb_room_img]:
+    if image_array is not None:
+      apply_stamps(image_array, window_stamps + door_stamps)
+
+  images = {"symb": symb_img, "cont": cont_img, "symb_room": symb_room_img, "cont_room": cont_room_img}
+  return images, windows, doors
+
+
+class RecordedRandom:
+  #Draws from rng and keeps the draws, which ReplayedRandom returns again in the same order
+
+  def __init__(self, rng):
+    self.rng = rng
+    self.draws = []
+
+  def random(self):
+    draw = self.rng.random()
+    self.draws.append(draw)
+    return draw
+
+
+class ReplayedRandom:
+
+  def __init__(self, draws):
+    self.draws = iter(draws)
+
+  def random(self):
+    return next(self.draws)
+
+
+def finish_plan(config, rng, img, width, height, rooms, room_colors, rejections, recorder, allow=None):
+  bounds_height = height - config.margin * 2
+  bounds_width = width - config.margin * 2
+
+  #############################################################################
+  ### 4. Collect all necessary topological information from the drawn image ###
+
+  #Mark and collect wall intersection points (nodes)
+  nodes = set()
+  for r in rooms:
+    img[r.x1 - 1, r.y1] = node_label
+    nodes.add((r.x1 - 1, r.y1))
+    img[r.x1 - 1, r.y2 + 1] = node_label
+    nodes.add((r.x1 - 1, r.y2 + 1))
+    img[r.x2, r.y2 + 1] = node_label
+    nodes.add((r.x2, r.y2 + 1))
+    img[r.x2, r.y1] = node_label
+    nodes.add((r.x2, r.y1))
+    fill_bounds(img, r.x1, r.y1 + 1, r.x2 - 1, r.y2, bg_label)
+
+  graph = extract_wall_graph(img, nodes, rooms, bg_label, outer_wall_label)
+  horizontal_inner_edges = graph.edges_of("horizontal", "inner")
+  horizontal_outer_edges = graph.edges_of("horizontal", "outer")
+  vertical_inner_edges = graph.edges_of("vertical", "inner")
+  vertical_outer_edges = graph.edges_of("vertical", "outer")
+  recorder.lap("topology")
+  recorder.note(rooms=len(rooms), nodes=len(nodes), edges={
+    "horizontal_inner": len(horizontal_inner_edges), "horizontal_outer": len(horizontal_outer_edges),
+    "vertical_inner": len(vertical_inner_edges), "vertical_outer": len(vertical_outer_edges)})
+
+  #############################################################################################
+  ### 5. Use the collected information to draw the final image, including doors and windows ###
+
+  #Draw final walls with windows and doors
+  for e in horizontal_inner_edges:
+    #print("Horizontal edge draw from" + str(e[0]) + " to [" + str(e[0][0]) + ", " + str(e[0][1]+e[1]) + "]")
+    paint_span(img, e[0][0], e[0][1], e[0][1] + e[1], True, horizontal_inner_wall_label)
+    #Draw doors
+    if rng.randint(0, 100) < config.inner_door_probability and e[1] > config.door_size:
+      paint_opening(img, e[0][0], e[0][1] + e[1] // 2, config.door_size, True, horizontal_door_label)
+  for e in vertical_inner_edges:
+    #print("Vertical edge draw from" + str(e[0]) + " to [" + str(e[0][0]+e[1]) + ", " + str(e[0][1]) + "]")
+    paint_span(img, e[0][1], e[0][0], e[0][0] + e[1], False, vertical_inner_wall_label)
+    #Draw doors
+    if rng.randint(0, 100) < config.inner_door_probability and e[1] > config.door_size:
+      paint_opening(img, e[0][1], e[0][0] + e[1] // 2, config.door_size, False, vertical_door_label)
+
+  for e in horizontal_outer_edges:
+    #print("Horizontal edge draw from" + str(e[0]) + " to [" + str(e[0][0]) + ", " + str(e[0][1]+e[1]) + "]")
+    paint_span(img, e[0][0], e[0][1], e[0][1] + e[1], True, horizontal_outer_wall_label)
+    #Draw door
+    if rng.randint(0, 100) < config.outer_door_probability and e[1] > config.door_size:
+      paint_opening(img, e[0][0], e[0][1] + e[1] // 2, config.door_size, True, horizontal_door_label)
+    #Draw 2 windows
+    if e[1] > config.door_size + config.window_size * 3:
+      if rng.randint(0, 100) < config.window_probability:
+        paint_opening(img, e[0][0], e[0][1] + e[1] // 4, config.window_size, True, horizontal_window_label)
+      if rng.randint(0, 100) < config.window_probability:
+        paint_opening(img, e[0][0], e[0][1] + (e[1] // 4) * 3, config.window_size, True, horizontal_window_label)
+  for e in vertical_outer_edges:
+    #print("Vertical edge draw from" + str(e[0]) + " to [" + str(e[0][0]+e[1]) + ", " + str(e[0][1]) + "]")
+    paint_span(img, e[0][1], e[0][0], e[0][0] + e[1] + 1, False, vertical_outer_wall_label)
+    #Draw door
+    if rng.randint(0, 100) < config.outer_door_probability and e[1] > config.door_size:
+      paint_opening(img, e[0][1], e[0][0] + e[1] // 2, config.door_size, False, vertical_door_label)
+    #Draw 2 windows
+    if e[1] > config.door_size + config.window_size * 3:
+      if rng.randint(0, 100) < config.window_probability:
+        paint_opening(img, e[0][1], e[0][0] + e[1] // 4, config.window_size, False, vertical_window_label)
+      if rng.randint(0, 100) < config.window_probability:
+        paint_opening(img, e[0][1], e[0][0] + (e[1] // 4) * 3, config.window_size, False, vertical_window_label)
+  recorder.lap("openings")
+
+  #Reject or repair plans with rooms that cannot be entered
+  repairs = []
+  if config.plan_checks != "off":
+    reason, repairs = check_plan(config, img, rooms, graph)
+    recorder.lap("checks")
+    recorder.note(repairs=repairs)
+    if reason is not None:
+      rejections[reason] += 1
+      recorder.note(rejection=reason)
+      return None
+
+  ###############################
+  ### 6. Find room semantics ###
+
+  #Sort rooms by size through lambda expression
+  sorted_rooms = sorted(rooms, key=lambda r: (r.x2 - r.x1) * (r.y2 - r.y1) )
+
+  #Give a chance for a room to be a special room, otherwise they are just living rooms
+  bath_nr = 0
+  bath_chance = 50
+  kitchen_nr = 0
+  kitchen_chance = 50
+  for r in sorted_rooms:
+    if rng.randint(0,100) < bath_chance:
+      r.label = bath_label
+      bath_nr += 1
+      bath_chance = 5
+    elif rng.randint(0,100) < kitchen_chance:
+      r.label = kitchen_label
+      kitchen_nr += 1
+      kitchen_chance = 5
+    else:
+      r.label = living_label
+  recorder.lap("semantics")
+
+  #Recolor rooms
+  room_img = np.copy(img)
+  for r in rooms:
+    fill_bounds(room_img, r.x1, r.y1 + 1, r.x2 - 1, r.y2, r.label)
+
+  #Reject plans with too many copies of their layout before rendering them
+  fingerprint = layout_fingerprint(room_img)
+  recorder.lap("deduplication")
+  if allow is not None and not allow(fingerprint):
+    rejections["duplicate"] += 1
+    recorder.note(rejection="duplicate")
+    return None
+
+  palette, cont_palette = plan_palettes(config, room_colors)
+  symb_small_img = palette[img]
+
+  #Reject plans whose symbology would certainly fail before rendering them
+  reason = validate_symbology(symb_small_img, config.window_replacements + config.door_replacements, scale_factor)
+  recorder.lap("validation")
+  if reason is not None:
+    rejections[reason] += 1
+    recorder.note(rejection=reason)
+    return None
+
+  ###############################
+  ### 7. Apply plan symbology ###
+
+  #The layout stores draw the images later from the plan, the symbology is only checked on an image of
+  #one pixel per plan pixel
+  render_size = max(width, height) if config.output_format == "layouts" else config.render_size
+  stamp_rng = RecordedRandom(rng)
+  images, windows, doors = render_plan(config, stamp_rng, img, room_img, palette, cont_palette, render_size,
+                                       config.render_fit, recorder)
+  symb_img = images["symb"]
+
+  #Check if the image with symbology has colors or not. If it has, something went wrong.
+  contains_color = image_contains_color(symb_img)
+  recorder.lap("symbology")
+  recorder.note(windows=windows, doors=doors)
+  if contains_color:
+    rejections["symbology_color"] += 1
+    recorder.note(rejection="symbology_color")
+    return None
+
+  desc = create_description(config, building_size(bounds_width, config.max_width, bounds_height, config.max_height), kitchen_nr, bath_nr, len(rooms)-kitchen_nr-bath_nr, windows, doors, False, False)
+  desc_symb = create_description(config, building_size(bounds_width, config.max_width, bounds_height, config.max_height), kitchen_nr, bath_nr, len(rooms)-kitchen_nr-bath_nr, windows, doors, False, True)
+  semantic_desc = create_description(config, building_size(bounds_width, config.max_width, bounds_height, config.max_height), kitchen_nr, bath_nr, len(rooms)-kitchen_nr-bath_nr, windows, doors, True, False)
+  semantic_desc_symb = create_description(config, building_size(bounds_width, config.max_width, bounds_height, config.max_height), kitchen_nr, bath_nr, len(rooms)-kitchen_nr-bath_nr, windows, doors, True, True)
+
+  descriptions = {"symb": desc_symb, "cont": desc, "symb_room": semantic_desc_symb, "cont_room": semantic_desc}
+  metadata = {
+    "width": width,
+    "height": height,
+    "bounds_width": bounds_width,
+    "bounds_height": bounds_height,
+    "building_size": building_size(bounds_width, config.max_width, bounds_height, config.max_height).strip() or "medium",
+    "rooms": len(rooms),
+    "kitchens": kitchen_nr,
+    "baths": bath_nr,
+    "living_rooms": len(rooms) - kitchen_nr - bath_nr,
+    "windows": windows,
+    "doors": doors,
+    "wall_graph": graph.to_dict(),
+    "fingerprint": fingerprint,
+    "repairs": repairs
+  }
+  #Everything the layout stores need to draw the images again
+  layout = {
+    "labels": img,
+    "rooms": np.array([(r.x1, r.y1, r.x2, r.y2, r.label) for r in rooms], dtype=np.int16).reshape(-1, 5),
+    "room_colors": np.array(room_colors, dtype=np.uint8).reshape(-1, 3),
+    "draws": np.array(stamp_rng.draws)
+  }
+  recorder.lap("captioning")
+  recorder.note(rejection=None)
+  return images, descriptions, metadata, layout
+
+
+def telemetry_record(telemetry, index, attempt):
+  #Start the telemetry record of an attempt at an index in the list telemetry, if given
+  if telemetry is None:
+    return None
+  record = {"index": index, "attempt": attempt}
+  telemetry.append(record)
+  return record
+
+
+def check_attempts(config, index, attempt, reasons):
+  #Stop instead of retrying an index forever, for example once every layout the settings allow has its
+  #dedup_copies plans, or when settings make every plan fail the same way. reasons counts the rejections
+  #of the attempts so far.
+  if attempt >= config.max_attempts:
+    raise RuntimeError("No plan passed for number " + str(index) + " in " + str(config.max_attempts) + " attempts, "
+                       "rejected as " + ", ".join(reason + " " + str(n) for reason, n in reasons.most_common(3)) +
+                       ", see max_attempts")
+
+
+def generate_sample(config, seed, index, rejections, telemetry=None, allow=None, first_attempt=0):
+  #Retry with the next attempt of this index until a plan passes, so numbering stays dense.
+  #Pass a list as telemetry to collect a telemetry record for every attempt in it, and allow to reject
+  #duplicates, see generate_plan.
+  attempt = first_attempt
+  before = Counter(rejections)
+  while True:
+    check_attempts(config, index, attempt, rejections - before)
+    plan = generate_plan(config, plan_random(seed, index, attempt), rejections, telemetry_record(telemetry, index, attempt),
+                         allow)
+    if plan is not None:
+      break
+    attempt += 1
+  images, descriptions, metadata, layout = plan
+  metadata.update({"index": index, "seed": seed, "attempt": attempt})
+  return {"index": index, "images": images, "descriptions": descriptions, "metadata": metadata,
+          "layout": layout}
+
+
+def generate_batch(config, seed, indices, rejections, telemetry=None, allow=None):
+  #Generate the samples of several indices at once, exactly like generate_sample would. All indices
+  #still without a plan retry together with their next attempt.
+  if len(indices) == 1:
+    return [generate_sample(config, seed, indices[0], rejections, telemetry, allow)]
+  attempts = {index: 0 for index in indices}
+  samples = {}
+  pending = list(indices)
+  before = Counter(rejections)
+  while pending:
+    for index in pending:
+      #With the rejections of all plans of the batch
+      check_attempts(config, index, attempts[index], rejections - before)
+    records = None
+    if telemetry is not None:
+      records = [telemetry_record(telemetry, index, attempts[index]) for index in pending]
+    plans = generate_plans(config, [plan_random(seed, index, attempts[index]) for index in pending], rejections, records,
+                           allow)
+    for index, plan in zip(pending, plans):
+      if plan is None:
+        attempts[index] += 1
+        continue
+      images, descriptions, metadata, layout = plan
+      metadata.update({"index": index, "seed": seed, "attempt": attempts[index]})
+      samples[index] = {"index": index, "images": images, "descriptions": descriptions, "metadata": metadata,
+                        "layout": layout}
+    pending = [index for index in pending if index not in samples]
+  return [samples[index] for index in indices]
+
+
+def batches(indices, size):
+  #Split indices into consecutive batches of the given size, the last one may be shorter
+  batch = []
+  for index in indices:
+    batch.append(index)
+    if len(batch) == size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+def generate_samples(seed, start=0, stop=None, worker_id=0, num_workers=1, rejections=None, telemetry=None,
+                     config=None):
+  #Lazily yield the samples start, start + 1, ... up to stop (or forever) as dictionaries of
+  #"index", "images" and "descriptions" by variant, and "metadata". Only one sample is held at a time,
+  #or one batch when batch_size samples are generated at once.
+  #Every worker of a data loader takes every num_workers-th index, starting at its worker_id.
+  #Pass a Counter as rejections to collect the rejected plans by reason, and a list as telemetry to
+  #collect a telemetry record for every attempt. Plans follow the given Config, or the default one.
+  if config is None:
+    config = Config()
+  if rejections is None:
+    rejections = Counter()
+  first = start + worker_id
+  indices = count(first, num_workers) if stop is None else range(first, stop, num_workers)
+  for batch in batches(indices, config.batch_size):
+    yield from generate_batch(config, seed, batch, rejections, telemetry)
+
+
+def encode_sample(config, sample):
+  if config.output_format == "layouts":
+    return {"layout": sample["layout"], "descriptions": sample["descriptions"], "metadata": sample["metadata"]}
+  return encode_plan(sample["images"], sample["descriptions"], sample["metadata"], config.png_mode,
+                     config.png_compress_level)
+
+
+def note_encoded_sizes(telemetry, records):
+  #Add the encoded bytes of the passed plans to their telemetry records
+  encoded = {(record["metadata"]["index"], record["metadata"]["attempt"]): record for record in records}
+  for attempt in telemetry:
+    record = encoded.get((attempt["index"], attempt["attempt"]))
+    if record is not None:
+      attempt["bytes"] = encoded_size(record)
+
+
+def sample_batch(config, seed, indices, with_telemetry=False, allow=None):
+  #Generate a batch of samples with the rejections and, if asked for, the telemetry records of all attempts
+  rejections = Counter()
+  telemetry = [] if with_telemetry else None
+  samples = generate_batch(config, seed, indices, rejections, telemetry, allow)
+  return rejections, samples, telemetry
+
+
+def encode_batch(config, seed, indices, with_telemetry=False):
+  #Like sample_batch but with encoded records, for worker processes to send back as little as possible
+  rejections, samples, telemetry = sample_batch(config, seed, indices, with_telemetry)
+  records = [encode_sample(config, sample) for sample in samples]
+  if telemetry is not None:
+    note_encoded_sizes(telemetry, records)
+  return rejections, records, telemetry
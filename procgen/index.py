@@ -0,0 +1,74 @@
+import os
+import sqlite3
+
+
+#Columns of the plans table after the plan number, filled from the metadata of every plan
+columns = [
+  ("width", "INTEGER"),
+  ("height", "INTEGER"),
+  ("bounds_width", "INTEGER"),
+  ("bounds_height", "INTEGER"),
+  ("building_size", "TEXT"),
+  ("rooms", "INTEGER"),
+  ("kitchens", "INTEGER"),
+  ("baths", "INTEGER"),
+  ("living_rooms", "INTEGER"),
+  ("windows", "INTEGER"),
+  ("doors", "INTEGER"),
+  ("nodes", "INTEGER"),
+  ("edges", "INTEGER"),
+  ("inner_edges", "INTEGER"),
+  ("outer_edges", "INTEGER"),
+  ("fingerprint", "INTEGER"), #See layout_fingerprint
+  ("seed", "TEXT"), #Base seeds exceed the 64 bit integers of SQLite
+  ("attempt", "INTEGER"),
+  ("shard", "TEXT") #Tar shard of the plan, NULL for loose files at <variant>/<variant><number>.png
+]
+
+
+def index_row(record, shard):
+  metadata = record["metadata"]
+  edges = metadata["wall_graph"]["edges"]
+  values = dict(metadata,
+                nodes=len(metadata["wall_graph"]["nodes"]),
+                edges=len(edges),
+                inner_edges=sum(edge["kind"] == "inner" for edge in edges),
+                outer_edges=sum(edge["kind"] == "outer" for edge in edges),
+                seed=str(metadata["seed"]),
+                shard=shard)
+  return [metadata["index"]] + [values[name] for name, _ in columns]
+
+
+class MetadataIndex:
+  #SQLite table "plans" with one row per written plan, keyed by its number, for selecting plans without
+  #reading their files, for example
+  #  SELECT number FROM plans WHERE building_size = 'large' AND windows > 6 AND kitchens = 0
+  #Rows of plans that are written again replace the old ones. Rows are only committed with the
+  #checkpoints of the manifest and on close, so that after a crash the table holds exactly the plans the
+  #manifest counts as written. The index is only used from one thread at a time, not necessarily the one
+  #that opened it.
+
+  def __init__(self, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    self.connection = sqlite3.connect(path, check_same_thread=False)
+    self.connection.execute("CREATE TABLE IF NOT EXISTS plans (number INTEGER PRIMARY KEY, " +
+                            ", ".join(name + " " + kind for name, kind in columns) + ")")
+    for name in ["building_size", "rooms", "windows", "doors"]:
+      self.connection.execute("CREATE INDEX IF NOT EXISTS plans_%s ON plans (%s)" % (name, name))
+
+  def add(self, record, shard=None):
+    self.connection.execute("INSERT OR REPLACE INTO plans VALUES (" + ", ".join("?" * (len(columns) + 1)) + ")",
+                            index_row(record, shard))
+
+  def truncate(self, stop):
+    #Drop the rows of plans from stop on, which are not written yet. Earlier versions committed rows
+    #between checkpoints, which a crash left behind.
+    self.connection.execute("DELETE FROM plans WHERE number >= ?", (stop,))
+    self.commit()
+
+  def commit(self):
+    self.connection.commit()
+
+  def close(self):
+    self.commit()
+    self.connection.close()
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+#Canvas primitives as single slice or mask operations. They paint exactly the pixels the per-pixel
+#loops they replace did, in the same order where pixels are painted more than once.
+
+
+def draw_bounds(image, x1, y1, x2, y2, color):
+  # Draw horizontal lines
+  image[y1, x1:x2 + 1] = color
+  image[y2, x1:x2 + 1] = color
+  # Draw vertical lines
+  image[y1:y2 + 1, x1] = color
+  image[y1:y2 + 1, x2] = color
+
+
+def fill_bounds(image, x1, y1, x2, y2, color):
+  #Fill from x1 to x2 and y1 to y2, both inclusive
+  image[x1:x2 + 1, y1:y2 + 1] = color
+
+
+def paint_span(image, line, start, stop, horizontal, color):
+  #Paint the pixels from start up to stop (exclusive) along row line if horizontal, else along column line
+  if horizontal:
+    image[line, start:stop] = color
+  else:
+    image[start:stop, line] = color
+
+
+def paint_opening(image, line, center, size, horizontal, color):
+  #Paint a door or window of the given size centered at center along row line if horizontal, else along column line
+  paint_span(image, line, center - size // 2, center + size // 2, horizontal, color)
+
+
+def draw_room_walls(image, room, bg_color, outer_wall_color, wall_color):
+  #Draw the walls along the borders of a room, as outer walls where they run along the background
+  #and as inner walls otherwise. Every wall only looks at pixels before they are painted by itself,
+  #but sees the walls drawn before it.
+  x1, y1, x2, y2 = room.x1, room.y1, room.x2, room.y2
+  #Lower edge
+  image[x2, y1:y2 + 1] = np.where(image[x2 + 1, y1:y2 + 1] == bg_color, outer_wall_color, wall_color)
+  #Upper edge
+  image[x1 - 1, y1:y2 + 1] = np.where(image[x1 - 1, y1:y2 + 1] == bg_color, outer_wall_color, wall_color)
+  #Left edge
+  image[x1:x2 + 1, y1] = np.where(image[x1:x2 + 1, y1 - 1] == bg_color, outer_wall_color, wall_color)
+  #Right edge
+  image[x1 - 1:x2 + 1, y2 + 1] = np.where(image[x1 - 1:x2 + 1, y2 + 1] == bg_color, outer_wall_color, wall_color)
+
+
+
+def draw_room_walls_batch(images, plan_rooms, bg_color, outer_wall_color, wall_color):
+  #draw_room_walls for a stack of images with the rooms of every image. The walls of the first rooms of
+  #all images are drawn at once, then those of the second ones and so on, so every image sees its walls
+  #drawn in the same order.
+  rows = np.arange(images.shape[1])
+  cols = np.arange(images.shape[2])
+  for k in range(0, max((len(rooms) for rooms in plan_rooms), default=0)):
+    p = np.array([i for i, rooms in enumerate(plan_rooms) if k < len(rooms)])
+    x1, y1, x2, y2 = np.array([[r.x1, r.y1, r.x2, r.y2] for rooms in plan_rooms if k < len(rooms)
+                               for r in rooms[k:k + 1]]).T
+    across = (cols >= y1[:, np.newaxis]) & (cols <= y2[:, np.newaxis])
+    along = (rows >= x1[:, np.newaxis]) & (rows <= x2[:, np.newaxis])
+    #Lower edge
+    walls = np.where(images[p, x2 + 1] == bg_color, outer_wall_color, wall_color)
+    images[p, x2] = np.where(across, walls, images[p, x2])
+    #Upper edge
+    walls = np.where(images[p, x1 - 1] == bg_color, outer_wall_color, wall_color)
+    images[p, x1 - 1] = np.where(across, walls, images[p, x1 - 1])
+    #Left edge
+    walls = np.where(images[p, :, y1 - 1] == bg_color, outer_wall_color, wall_color)
+    images[p, :, y1] = np.where(along, walls, images[p, :, y1])
+    #Right edge, which starts one row further up
+    along[np.arange(len(p)), x1 - 1] = True
+    walls = np.where(images[p, :, y2 + 1] == bg_color, outer_wall_color, wall_color)
+    images[p, :, y2 + 1] = np.where(along, walls, images[p, :, y2 + 1])
@@ -0,0 +1,46 @@
+import json
+import os
+from .config import portable_symbology_path
+
+
+#Settings that may change when a run is resumed, as they do not change its plans
+runtime_settings = {"number_of_generations", "base_seed", "workers", "writer_threads", "writer_queue_size",
+                    "telemetry_path", "telemetry_interval", "existing_runs", "checkpoint_interval", "max_attempts"}
+
+
+class Manifest:
+  #<path>/manifest.json lists every run that wrote plans to path with its settings, base seed and the range
+  #start to stop of its plan numbers. Plans are written in order, so the plans start to written - 1 of a run
+  #are complete. The file is replaced atomically, a crash leaves the last checkpoint.
+
+  def __init__(self, path):
+    self.path = os.path.join(path, "manifest.json")
+    self.runs = []
+    if os.path.exists(self.path):
+      with open(self.path) as f:
+        self.runs = json.load(f)["runs"]
+
+  def start_run(self, config, seed, start, stop):
+    run = {"config": json.loads(json.dumps(config.to_dict())), "base_seed": seed, "start": start, "stop": stop,
+           "written": start}
+    self.runs.append(run)
+    return run
+
+  def check_resumable(self, config, run):
+    #Raise if config would generate other plans than the run it resumes
+    settings = json.loads(json.dumps(config.to_dict()))
+    stored = dict(run["config"], symbology_path=portable_symbology_path(run["config"].get("symbology_path")))
+    changed = sorted(name for name in settings
+                     if name not in runtime_settings and settings[name] != stored.get(name))
+    if changed:
+      raise ValueError("Cannot resume a run with other settings (" + ", ".join(changed) + "), "
+                       "finish it with its settings or start a new one with --existing-runs append")
+
+  def save(self):
+    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+    temporary = self.path + ".tmp"
+    with open(temporary, 'w') as f:
+      json.dump({"runs": self.runs}, f, indent=1)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temporary, self.path)
@@ -0,0 +1,302 @@
+import io
+import json
+import os
+import queue
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+
+#Plan variants in the order they are written
+variants = ["symb", "cont", "symb_room", "cont_room"]
+
+
+#Palette index of every 24 bit color, allocated on first use by every thread and cleared after every image
+color_index = threading.local()
+
+
+def palette_image(image):
+  #The image with indexed colors, None if it has more colors than a palette holds. Pillow writes palettes
+  #of up to 16 colors with 1, 2 or 4 bits per pixel, so two color images become 1 bit PNGs.
+  colors = Image.fromarray(image).getcolors(256)
+  if colors is None:
+    return None
+  if not hasattr(color_index, "table"):
+    color_index.table = np.zeros(1 << 24, np.uint8)
+  table = color_index.table
+  palette = np.array([color for _, color in colors], np.uint32)
+  keys = palette[:, 0] | palette[:, 1] << 8 | palette[:, 2] << 16
+  #Pad the pixels to 32 bits to read them as one key each
+  padded = np.zeros(image.shape[:2] + (4,), np.uint8)
+  padded[..., :3] = image
+  table[keys] = np.arange(len(keys), dtype=np.uint8)
+  indices = table[padded.view(np.uint32)[..., 0]]
+  table[keys] = 0
+  indexed = Image.fromarray(indices, "P")
+  indexed.putpalette(palette.astype(np.uint8).tobytes())
+  return indexed
+
+
+def encode_png(image, mode="palette", compress_level=6):
+  #"palette" writes indexed PNGs, "rgb" skips the color mapping and writes larger files faster,
+  #compress_level is the zlib level from 0 (none) to 9 (smallest)
+  if mode not in ["palette", "rgb"]:
+    raise ValueError("Unknown PNG mode " + repr(mode))
+  indexed = palette_image(image) if mode == "palette" else None
+  buffer = io.BytesIO()
+  (indexed or Image.fromarray(image)).save(buffer, format="png", compress_level=compress_level)
+  return buffer.getvalue()
+
+
+def encode_plan(images, descriptions, metadata, png_mode="palette", compress_level=6):
+  #Encode a plan into a record that can be sent between processes and handed to a writer
+  return {
+    "images": {variant: encode_png(images[variant], png_mode, compress_level) for variant in variants},
+    "descriptions": {variant: descriptions[variant] for variant in variants},
+    "metadata": metadata
+  }
+
+
+def encoded_size(record):
+  #Bytes of all images or the layout, descriptions and metadata of an encoded plan
+  return (sum(len(image) for image in record.get("images", {}).values())
+          + sum(array.nbytes for array in record.get("layout", {}).values())
+          + sum(len(record["descriptions"][variant].encode()) for variant in variants)
+          + len(json.dumps(record["metadata"]).encode()))
+
+
+class FileWriter:
+  #Loose files: <path>/<variant>/<variant><number>.png and .txt for every variant
+  concurrent = True #Plans may be written from several threads at once
+
+  def __init__(self, path):
+    self.path = path
+    for variant in variants:
+      os.makedirs(os.path.join(path, variant), exist_ok=True)
+
+  def write(self, number, record):
+    #Returns the shard of the plan, None for loose files
+    for variant in variants:
+      name = os.path.join(self.path, variant, variant + str(number))
+      with open(name + ".png", 'wb') as f:
+        f.write(record["images"][variant])
+      with open(name + ".txt", 'w') as f:
+        f.write(record["descriptions"][variant])
+
+  def flush(self):
+    pass
+
+  def close(self):
+    pass
+
+
+class ShardWriter:
+  #WebDataset style tar shards: <path>/shard-<shard>.tar holds shard_size consecutive samples,
+  #each as <key>.<variant>.png, <key>.<variant>.txt and <key>.json next to each other.
+  #<path>/shard-<shard>.json maps every key and extension to the offset and size of its data in
+  #the tar for random access, and <path>/shards.json lists all closed shards with their sample counts.
+  #New shards are added after the listed ones of earlier runs, flush closes the current shard.
+  concurrent = False
+
+  def __init__(self, path, shard_size):
+    self.path = path
+    self.shard_size = shard_size
+    self.shards = []
+    self.tar = None
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, "shards.json")):
+      with open(os.path.join(path, "shards.json")) as f:
+        self.shards = json.load(f)["shardlist"]
+
+  def add(self, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    self.tar.addfile(info, io.BytesIO(data))
+    #The data ends padded to a full block right before the current offset
+    blocks = -(-len(data) // tarfile.BLOCKSIZE)
+    return [self.tar.offset - blocks * tarfile.BLOCKSIZE, len(data)]
+
+  def write(self, number, record):
+    if self.tar is None or len(self.members) == self.shard_size:
+      self.close_shard()
+      self.name = "shard-%06d" % len(self.shards)
+      self.tar = tarfile.open(os.path.join(self.path, self.name + ".tar"), "w", format=tarfile.USTAR_FORMAT)
+      self.members = {}
+
+    key = "%09d" % number
+    members = {}
+    for variant in variants:
+      members[variant + ".png"] = self.add(key + "." + variant + ".png", record["images"][variant])
+      members[variant + ".txt"] = self.add(key + "." + variant + ".txt", record["descriptions"][variant].encode())
+    members["json"] = self.add(key + ".json", json.dumps(record["metadata"]).encode())
+    self.members[key] = members
+    return self.name + ".tar"
+
+  def close_shard(self):
+    if self.tar is None:
+      return
+    self.tar.close()
+    self.tar = None
+    with open(os.path.join(self.path, self.name + ".json"), 'w') as f:
+      json.dump(self.members, f)
+    self.shards.append({"url": self.name + ".tar", "nsamples": len(self.members)})
+    self.write_shard_list()
+
+  def write_shard_list(self):
+    with open(os.path.join(self.path, "shards.json"), 'w') as f:
+      json.dump({"shardlist": self.shards}, f, indent=1)
+
+  def flush(self):
+    self.close_shard()
+
+  def close(self):
+    self.close_shard()
+    self.write_shard_list()
+
+
+#Arrays of every chunk of a layout store, see LayoutWriter
+layout_arrays = ["numbers", "sizes", "labels", "rooms", "room_counts", "room_colors", "color_counts", "draws", "draw_counts"]
+
+
+class LayoutWriter:
+  #Layouts instead of images: everything needed to render the images again (see procgen.store),
+  #a few kilobytes per plan. <path>/layouts-<chunk>/ holds shard_size consecutive plans as one NumPy
+  #array per name in layout_arrays, padded to the largest plan of the chunk, along with the descriptions
+  #and metadata of the plans in records.json and the settings in config.json. <path>/layouts.json lists
+  #all closed chunks with their plan counts. Like ShardWriter, new chunks are added after the listed ones
+  #and flush closes the current chunk.
+  concurrent = False
+
+  def __init__(self, path, shard_size, config):
+    self.path = path
+    self.shard_size = shard_size
+    self.config = config
+    self.chunks = []
+    self.records = []
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, "layouts.json")):
+      with open(os.path.join(path, "layouts.json")) as f:
+        self.chunks = json.load(f)["chunklist"]
+
+  def write(self, number, record):
+    if len(self.records) == self.shard_size:
+      self.close_chunk()
+    self.records.append((number, record))
+    return "layouts-%06d" % len(self.chunks)
+
+  def close_chunk(self):
+    if not self.records:
+      return
+    layouts = [record["layout"] for number, record in self.records]
+    n = len(layouts)
+    arrays = {
+      "numbers": np.array([number for number, record in self.records], dtype=np.int64),
+      "sizes": np.array([layout["labels"].shape for layout in layouts], dtype=np.int16),
+      "labels": np.zeros((n,) + tuple(np.max([layout["labels"].shape for layout in layouts], axis=0)),
+                         np.result_type(*[layout["labels"] for layout in layouts])),
+      "rooms": np.zeros((n, max(len(layout["rooms"]) for layout in layouts), 5), np.int16),
+      "room_counts": np.array([len(layout["rooms"]) for layout in layouts], dtype=np.int16),
+      "room_colors": np.zeros((n, max(len(layout["room_colors"]) for layout in layouts), 3), np.uint8),
+      "color_counts": np.array([len(layout["room_colors"]) for layout in layouts], dtype=np.int16),
+      "draws": np.zeros((n, max(len(layout["draws"]) for layout in layouts)), np.float64),
+      "draw_counts": np.array([len(layout["draws"]) for layout in layouts], dtype=np.int32)
+    }
+    for i, layout in enumerate(layouts):
+      width, height = layout["labels"].shape
+      arrays["labels"][i, :width, :height] = layout["labels"]
+      arrays["rooms"][i, :len(layout["rooms"])] = layout["rooms"]
+      arrays["room_colors"][i, :len(layout["room_colors"])] = layout["room_colors"]
+      arrays["draws"][i, :len(layout["draws"])] = layout["draws"]
+
+    name = "layouts-%06d" % len(self.chunks)
+    directory = os.path.join(self.path, name)
+    os.makedirs(directory, exist_ok=True)
+    for array_name in layout_arrays:
+      np.save(os.path.join(directory, array_name + ".npy"), arrays[array_name])
+    with open(os.path.join(directory, "records.json"), 'w') as f:
+      json.dump([{"descriptions": record["descriptions"], "metadata": record["metadata"]}
+                 for number, record in self.records], f)
+    self.config.save(os.path.join(directory, "config.json"))
+    self.chunks.append({"name": name, "nsamples": n})
+    self.records = []
+    with open(os.path.join(self.path, "layouts.json"), 'w') as f:
+      json.dump({"chunklist": self.chunks}, f, indent=1)
+
+  def flush(self):
+    self.close_chunk()
+
+  def close(self):
+    self.close_chunk()
+
+
+class AsyncWriter:
+  #Encodes and writes plans on a thread pool while the caller generates the next ones. submit queues a batch
+  #of samples, or of records if encode is None, and blocks while queue_size batches are waiting. Batches are
+  #finished in the order they were submitted: non-concurrent writers get the records in that order from one
+  #thread, and done(records, shards, context) is called from that thread once a batch is written, with the
+  #shard the writer put every record in. The first error of any thread is raised by the next submit or by close.
+
+  def __init__(self, writer, threads, queue_size, encode=None, done=None):
+    self.writer = writer
+    self.encode = encode
+    self.done = done
+    self.error = None
+    self.pool = ThreadPoolExecutor(threads)
+    self.batches = queue.Queue(queue_size)
+    self.thread = threading.Thread(target=self.finish_batches, daemon=True)
+    self.thread.start()
+
+  def process(self, item):
+    record = item if self.encode is None else self.encode(item)
+    if self.writer.concurrent:
+      return record, self.writer.write(record["metadata"]["index"], record)
+    return record, None
+
+  def finish_batches(self):
+    while True:
+      batch = self.batches.get()
+      if batch is None:
+        return
+      futures, context = batch
+      if self.error is not None:
+        #Keep taking batches so that submit never waits for a failed writer
+        for future in futures:
+          future.cancel()
+        continue
+      try:
+        records, shards = zip(*[future.result() for future in futures]) if futures else ((), ())
+        if not self.writer.concurrent:
+          shards = [self.writer.write(record["metadata"]["index"], record) for record in records]
+        if self.done is not None:
+          self.done(records, shards, context)
+      except BaseException as error:
+        self.error = error
+
+  def raise_error(self):
+    if self.error is not None:
+      raise self.error
+
+  def submit(self, items, context=None):
+    self.raise_error()
+    self.batches.put(([self.pool.submit(self.process, item) for item in items], context))
+
+  def close(self):
+    self.batches.put(None)
+    self.thread.join()
+    self.pool.shutdown()
+    self.writer.close()
+    self.raise_error()
+
+
+def open_writer(output_format, path, shard_size, config=None):
+  #The layouts store the config of their plans for rendering them
+  if output_format == "files":
+    return FileWriter(path)
+  elif output_format == "shards":
+    return ShardWriter(path, shard_size)
+  elif output_format == "layouts":
+    return LayoutWriter(path, shard_size, config)
+  raise ValueError("Unknown output format " + repr(output_format))
@@ -0,0 +1,75 @@
+import json
+import os
+import numpy as np
+from .config import Config
+from .generation import PlanRecorder, ReplayedRandom, plan_palettes, render_plan
+from .kernels import fill_bounds
+from .output import layout_arrays, variants
+
+
+def render_layout(config, layout, variants=None, render_size=None, render_fit="pad"):
+  #Render the images of a plan from its layout as generated with config: all four versions at
+  #30 pixels per plan pixel, or the given variants at the given size like config.render_size would
+  img = np.asarray(layout["labels"])
+  room_img = np.copy(img)
+  for x1, y1, x2, y2, label in layout["rooms"]:
+    fill_bounds(room_img, x1, y1 + 1, x2 - 1, y2, label)
+  palette, cont_palette = plan_palettes(config, [tuple(color) for color in layout["room_colors"]])
+  images, windows, doors = render_plan(config, ReplayedRandom(layout["draws"]), img, room_img, palette, cont_palette,
+                                       render_size, render_fit, PlanRecorder(None), variants)
+  return images
+
+
+class LayoutStore:
+  #The plans written with output_format "layouts" to path, with all arrays memory-mapped. Plans are
+  #found by their number and rendered on demand, for example in the workers of a data loader:
+  #  store = LayoutStore("generations")
+  #  sample = store.sample(12, ["cont_room"], render_size=512)
+
+  def __init__(self, path):
+    self.path = path
+    with open(os.path.join(path, "layouts.json")) as f:
+      chunks = json.load(f)["chunklist"]
+    self.chunks = []
+    self.locations = {}
+    for chunk in chunks:
+      directory = os.path.join(path, chunk["name"])
+      arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r") for name in layout_arrays}
+      with open(os.path.join(directory, "records.json")) as f:
+        arrays["records"] = json.load(f)
+      arrays["config"] = Config.load(os.path.join(directory, "config.json"))
+      for row, number in enumerate(arrays["numbers"]):
+        self.locations[int(number)] = (len(self.chunks), row)
+      self.chunks.append(arrays)
+
+  def __len__(self):
+    return len(self.locations)
+
+  def numbers(self):
+    return sorted(self.locations)
+
+  def layout(self, number):
+    #The layout of a plan as views of the memory maps, and the config it was generated with
+    chunk, row = self.locations[number]
+    arrays = self.chunks[chunk]
+    width, height = arrays["sizes"][row]
+    layout = {
+      "labels": arrays["labels"][row, :width, :height],
+      "rooms": arrays["rooms"][row, :arrays["room_counts"][row]],
+      "room_colors": arrays["room_colors"][row, :arrays["color_counts"][row]],
+      "draws": arrays["draws"][row, :arrays["draw_counts"][row]]
+    }
+    return layout, arrays["config"]
+
+  def sample(self, number, variants=variants, render_size=None, render_fit="pad"):
+    #The sample of a plan like generate_samples yields it, with images of the given variants only
+    layout, config = self.layout(number)
+    chunk, row = self.locations[number]
+    record = self.chunks[chunk]["records"][row]
+    images = render_layout(config, layout, variants, render_size, render_fit)
+    return {
+      "index": number,
+      "images": {variant: images[variant] for variant in variants},
+      "descriptions": {variant: record["descriptions"][variant] for variant in variants},
+      "metadata": record["metadata"]
+    }
@@ -0,0 +1,62 @@
+import json
+from collections import Counter
+from time import perf_counter
+
+
+class TelemetryLog:
+  #Writes the telemetry record of every attempt at a plan as a JSON line. Every interval passed plans and
+  #at the end, it also writes and prints a summary of the run so far: throughput, rejections, repairs of the
+  #passed plans and the mean seconds per attempt spent in every stage.
+
+  def __init__(self, path, interval):
+    #Resumed runs add to the records of earlier ones
+    self.file = open(path, 'a')
+    self.interval = interval
+    self.start = perf_counter()
+    self.plans = 0
+    self.attempts = 0
+    self.bytes = 0
+    self.rejections = Counter()
+    self.repairs = Counter()
+    self.stage_seconds = Counter()
+
+  def write(self, record):
+    self.file.write(json.dumps(dict(record, type="plan")) + "\n")
+    self.attempts += 1
+    self.stage_seconds.update(record.get("stages", {}))
+    if record.get("rejection") is not None:
+      self.rejections[record["rejection"]] += 1
+      return
+    self.plans += 1
+    self.repairs.update(record.get("repairs", []))
+    self.bytes += record.get("bytes", 0)
+    if self.plans % self.interval == 0:
+      self.summarize()
+
+  def summary(self):
+    seconds = perf_counter() - self.start
+    return {
+      "type": "summary",
+      "seconds": seconds,
+      "plans": self.plans,
+      "attempts": self.attempts,
+      "plans_per_second": self.plans / seconds,
+      "rejection_rate": (self.attempts - self.plans) / max(self.attempts, 1),
+      "rejections": dict(self.rejections),
+      "repairs": dict(self.repairs),
+      "bytes": self.bytes,
+      "stage_seconds": {stage: total / self.attempts for stage, total in self.stage_seconds.items()}
+    }
+
+  def summarize(self):
+    summary = self.summary()
+    self.file.write(json.dumps(summary) + "\n")
+    self.file.flush()
+    slowest = max(summary["stage_seconds"].items(), key=lambda item: item[1], default=("none", 0))
+    print("Telemetry: %d plans in %.1f s (%.2f plans/s), %.0f%% of %d attempts rejected, slowest stage %s with %.1f ms" % (
+      summary["plans"], summary["seconds"], summary["plans_per_second"], summary["rejection_rate"] * 100,
+      summary["attempts"], slowest[0], slowest[1] * 1000))
+
+  def close(self):
+    self.summarize()
+    self.file.close()
@@ -0,0 +1,26 @@
+from collections import Counter
+import numpy as np
+from procgen import Config
+from procgen.generation import generate_batch, generate_sample
+
+
+def assert_same_sample(sample, expected):
+  assert sample["index"] == expected["index"]
+  assert sample["descriptions"] == expected["descriptions"]
+  assert sample["metadata"] == expected["metadata"]
+  for parts in ["images", "layout"]:
+    assert sample[parts].keys() == expected[parts].keys()
+    for name in expected[parts]:
+      assert np.array_equal(sample[parts][name], expected[parts][name])
+
+
+def test_batch_matches_samples():
+  for plan_checks in ["reject", "repair", "off"]:
+    config = Config(min_width=40, max_width=60, min_height=40, max_height=60, render_size=60, plan_checks=plan_checks)
+    indices = list(range(0, 12))
+    rejections, expected_rejections = Counter(), Counter()
+    samples = generate_batch(config, 5, indices, rejections)
+    expected = [generate_sample(config, 5, index, expected_rejections) for index in indices]
+    for sample, expected_sample in zip(samples, expected):
+      assert_same_sample(sample, expected_sample)
+    assert rejections == expected_rejections
@@ -0,0 +1,76 @@
+import numpy as np
+from procgen import Config
+from procgen.generation import (draw_layout, grow_rooms, label_dtype, plan_random, bg_label, floor_label,
+                                wall_label)
+from procgen.kernels import draw_bounds, fill_bounds
+
+
+#The growth loop grow_rooms replaced, as it was in proc_generation.py, on labels instead of colors
+
+
+def loop_grow_rooms(img, rooms, steps, free_labels):
+  for s in range(0, steps):
+    for r in rooms:
+      #Grow upwards
+      #Check upper edge
+      up_clear = True
+      for y in range(r.y1, r.y2 + 1):
+        if (img[r.x1 - 1, y] not in free_labels):
+          up_clear = False
+      if (up_clear):
+        r.x1 -= 1
+        for y in range(r.y1, r.y2 + 1):
+          img[r.x1, y] = r.label
+      #Grow downwards
+      #Check lower edge
+      down_clear = True
+      for y in range(r.y1, r.y2 + 1):
+        if (img[r.x2 + 1, y] not in free_labels):
+          down_clear = False
+      if (down_clear):
+        r.x2 += 1
+        for y in range(r.y1, r.y2 + 1):
+          img[r.x2, y] = r.label
+      #Grow left
+      #Check left edge
+      left_clear = True
+      for x in range(r.x1, r.x2 + 1):
+        if (img[x, r.y1 - 1] not in free_labels):
+          left_clear = False
+      if (left_clear):
+        r.y1 -= 1
+        for x in range(r.x1, r.x2 + 1):
+          img[x, r.y1] = r.label
+      #Grow right
+      #Check right edge
+      right_clear = True
+      for x in range(r.x1, r.x2 + 1):
+        if (img[x, r.y2 + 1] not in free_labels):
+          right_clear = False
+      if (right_clear):
+        r.y2 += 1
+        for x in range(r.x1, r.x2 + 1):
+          img[x, r.y2] = r.label
+
+
+def seeded_layout(config, seed):
+  #The image and rooms of the plan of a seed right before growing, like generate_plan draws them
+  width, height, rooms, room_colors, deleted = draw_layout(config, plan_random(seed, 0, 0))
+  img = np.full((width, height), bg_label, dtype=label_dtype(config))
+  draw_bounds(img, config.margin, config.margin, height - config.margin, width - config.margin, wall_label)
+  fill_bounds(img, config.margin + 1, config.margin + 1, width - config.margin - 1, height - config.margin - 1,
+              floor_label)
+  for r in rooms:
+    img[r.x1, r.y1] = r.label
+  return img, rooms, height - config.margin
+
+
+def test_grow_rooms():
+  for config in [Config(), Config(min_width=40, max_width=60, min_height=40, max_height=60, max_rooms=12)]:
+    for seed in range(20):
+      img, rooms, steps = seeded_layout(config, seed)
+      expected, expected_rooms, steps = seeded_layout(config, seed)
+      grow_rooms(img, rooms, steps, [floor_label, wall_label])
+      loop_grow_rooms(expected, expected_rooms, steps, [floor_label, wall_label])
+      assert [(r.x1, r.y1, r.x2, r.y2) for r in rooms] == [(r.x1, r.y1, r.x2, r.y2) for r in expected_rooms]
+      assert np.array_equal(img, expected)
@@ -0,0 +1,126 @@
+import random
+from types import SimpleNamespace
+import numpy as np
+from procgen.kernels import fill_bounds, paint_span, paint_opening, draw_room_walls, draw_room_walls_batch
+
+
+#The per-pixel loops the kernels replaced, as they were in proc_generation.py
+
+
+def loop_fill_bounds(image, x1, y1, x2, y2, color):
+  for i in range(x1, x2 + 1):
+    for j in range(y1, y2 + 1):
+      image[i, j] = color
+
+
+def loop_paint_span(image, line, start, stop, horizontal, color):
+  for i in range(start, stop):
+    if horizontal:
+      image[line, i] = color
+    else:
+      image[i, line] = color
+
+
+def loop_paint_opening(image, line, center, size, horizontal, color):
+  for i in range(center - size // 2, center + size // 2):
+    if horizontal:
+      image[line, i] = color
+    else:
+      image[i, line] = color
+
+
+def loop_draw_room_walls(img, r, bg_label, outer_wall_label, wall_label):
+  #Draw lower edge
+  for i in range(r.y1, r.y2 + 1):
+    if (img[r.x2 + 1, i] == bg_label):
+      img[r.x2, i] = outer_wall_label
+    else:
+      img[r.x2, i] = wall_label
+  #Draw upper edge
+  for i in range(r.y1, r.y2 + 1):
+    if (img[r.x1 - 1, i] == bg_label):
+      img[r.x1 - 1, i] = outer_wall_label
+    else:
+      img[r.x1 - 1, i] = wall_label
+  #Draw left edge
+  for i in range(r.x1, r.x2 + 1):
+    if (img[i, r.y1 - 1] == bg_label):
+      img[i, r.y1] = outer_wall_label
+    else:
+      img[i, r.y1] = wall_label
+  #Draw right edge
+  for i in range(r.x1 - 1, r.x2 + 1):
+    if (img[i, r.y2 + 1] == bg_label):
+      img[i, r.y2 + 1] = outer_wall_label
+    else:
+      img[i, r.y2 + 1] = wall_label
+
+
+def seeded_canvas(rng, width=40, height=30):
+  #A canvas of background and a few other labels
+  return np.array([[rng.choice([0, 0, 0, 1, 16]) for j in range(height)] for i in range(width)], dtype=np.uint8)
+
+
+def seeded_rooms(rng, canvas, count):
+  #Rooms with their walls inside the canvas, overlapping at random
+  width, height = canvas.shape
+  rooms = []
+  for r in range(count):
+    x1, y1 = rng.randint(1, width - 3), rng.randint(1, height - 3)
+    rooms.append(SimpleNamespace(x1=x1, y1=y1, x2=rng.randint(x1, width - 2), y2=rng.randint(y1, height - 2)))
+  return rooms
+
+
+def test_fill_bounds():
+  rng = random.Random(1)
+  for case in range(50):
+    canvas = seeded_canvas(rng)
+    expected = canvas.copy()
+    for r in seeded_rooms(rng, canvas, 5):
+      color = rng.randint(0, 20)
+      fill_bounds(canvas, r.x1, r.y1, r.x2, r.y2, color)
+      loop_fill_bounds(expected, r.x1, r.y1, r.x2, r.y2, color)
+    assert np.array_equal(canvas, expected)
+
+
+def test_paint_span_and_opening():
+  rng = random.Random(2)
+  for case in range(50):
+    canvas = seeded_canvas(rng)
+    expected = canvas.copy()
+    for k in range(10):
+      horizontal = rng.random() < 0.5
+      line = rng.randrange(canvas.shape[0] if horizontal else canvas.shape[1])
+      length = canvas.shape[1] if horizontal else canvas.shape[0]
+      start = rng.randrange(length)
+      stop = rng.randint(start, length)
+      paint_span(canvas, line, start, stop, horizontal, 5)
+      loop_paint_span(expected, line, start, stop, horizontal, 5)
+      size = rng.randint(1, 6)
+      center = rng.randint(size // 2, length - size // 2)
+      paint_opening(canvas, line, center, size, horizontal, 9)
+      loop_paint_opening(expected, line, center, size, horizontal, 9)
+    assert np.array_equal(canvas, expected)
+
+
+def test_draw_room_walls():
+  rng = random.Random(3)
+  for case in range(50):
+    canvas = seeded_canvas(rng)
+    expected = canvas.copy()
+    for r in seeded_rooms(rng, canvas, 6):
+      draw_room_walls(canvas, r, 0, 3, 2)
+      loop_draw_room_walls(expected, r, 0, 3, 2)
+    assert np.array_equal(canvas, expected)
+
+
+def test_draw_room_walls_batch():
+  rng = random.Random(4)
+  canvases = np.stack([seeded_canvas(rng) for p in range(8)])
+  plan_rooms = [seeded_rooms(rng, canvas, rng.randint(0, 6)) for canvas in canvases]
+  expected = canvases.copy()
+  for image, rooms in zip(expected, plan_rooms):
+    for r in rooms:
+      loop_draw_room_walls(image, r, 0, 3, 2)
+  draw_room_walls_batch(canvases, plan_rooms, 0, 3, 2)
+  assert np.array_equal(canvases, expected)
@@ -0,0 +1,135 @@
+import random
+from collections import Counter
+import numpy as np
+from procgen import Config
+from procgen.generation import generate_sample, plan_palettes, load_sprite, color_mask, find_rectangles, scale_factor
+from procgen.kernels import fill_bounds
+from procgen.store import render_layout
+
+
+#The full resolution symbology the stamps of CellFit replaced: scale the plan, then find and replace the
+#rectangles of every color on the scaled image
+
+
+def scale_image_nn(image_array, scale_factor):
+  # Get the dimensions of the original image
+  height, width, channels = image_array.shape
+
+  # Calculate the new dimensions for the scaled image
+  new_height, new_width = int(height * scale_factor), int(width * scale_factor)
+
+  # Calculate the scaling factor for each dimension
+  y_scale = height / new_height
+  x_scale = width / new_width
+
+  # Calculate the corresponding pixel in the original image for every row and column,
+  # with the same float arithmetic as a per-pixel lookup would use
+  original_y = (np.arange(new_height) * y_scale).astype(np.intp)
+  original_x = (np.arange(new_width) * x_scale).astype(np.intp)
+
+  # Perform nearest-neighbor interpolation by gathering whole columns, then whole rows
+  return np.take(np.take(image_array, original_x, axis=1), original_y, axis=0)
+
+
+def replace_rectangles(image_array, color, replacement_image, x_size, y_size,
+                       flip_chance, up_down, scale_factor, rng=random):
+  sprites, black_pixels_masks = load_sprite(replacement_image, image_array.shape[2], up_down)
+
+  # Create a mask of pixels that match the specified color
+  mask = color_mask(image_array, color)
+
+  # Find the coordinates of the top-left corner of each rectangle
+  x, y = find_rectangles(mask)
+  replacements = len(x)
+  if replacements == 0:
+    return 0
+
+  # Flip the replacement image with the given chance, flipped sprites are anchored
+  # at the opposite end of the rectangle
+  flipped = np.array([rng.random() < flip_chance for i in range(replacements)], dtype=np.intp)
+  y_start, x_start = y.copy(), x.copy()
+  if up_down:
+    y_start[flipped == 1] -= y_size - scale_factor
+  else:
+    x_start[flipped == 1] -= x_size - scale_factor
+  if (y_start.min() < 0 or x_start.min() < 0 or y_start.max() + y_size > image_array.shape[0]
+      or x_start.max() + x_size > image_array.shape[1]):
+    raise ValueError("The replacement image does not fit into the image at every rectangle")
+
+  # Replace each rectangular area with the replacement image: all black pixels of the
+  # replacement image, and all pixels of the detected rectangles
+  overlapping = ((np.abs(y_start[:, np.newaxis] - y_start) < y_size)
+                 & (np.abs(x_start[:, np.newaxis] - x_start) < x_size))
+  if np.count_nonzero(overlapping) > replacements:
+    # Later replacements overwrite earlier ones where they overlap, so keep their order
+    for i in range(replacements):
+      window = (slice(y_start[i], y_start[i] + y_size), slice(x_start[i], x_start[i] + x_size))
+      replaced = black_pixels_masks[flipped[i]] | mask[window]
+      image_array[window][replaced] = sprites[flipped[i]][replaced]
+  else:
+    # Replace all rectangles at once
+    rows = y_start[:, np.newaxis, np.newaxis] + np.arange(y_size)[:, np.newaxis]
+    cols = x_start[:, np.newaxis, np.newaxis] + np.arange(x_size)
+    rows, cols = np.broadcast_arrays(rows, cols)
+    replaced = black_pixels_masks[flipped] | mask[rows, cols]
+    image_array[rows[replaced], cols[replaced]] = sprites[flipped][replaced]
+
+  return replacements
+
+
+
+class PaddedRandom:
+  #Returns the given draws, then never flips, so that rectangles found beyond them do not end the replay
+
+  def __init__(self, draws):
+    self.draws = iter(draws)
+
+  def random(self):
+    return next(self.draws, 1.0)
+
+
+#Small canvases with few rooms, where openings run into each other more often. Plans 11/5, 63/5 and 98/5
+#have rectangles that the black pixels of earlier sprites split.
+config = Config(min_width=40, max_width=60, min_height=40, max_height=60, plan_checks="off")
+plans = [(11, 5), (63, 5), (98, 5), (0, 0), (7, 3)]
+
+
+def full_resolution_symbology(layout):
+  img = np.asarray(layout["labels"])
+  room_img = np.copy(img)
+  for x1, y1, x2, y2, label in layout["rooms"]:
+    fill_bounds(room_img, x1, y1 + 1, x2 - 1, y2, label)
+  palette, cont_palette = plan_palettes(config, [tuple(color) for color in layout["room_colors"]])
+  images = {}
+  for variant, labels in [("symb", img), ("symb_room", room_img)]:
+    images[variant] = scale_image_nn(palette[labels], scale_factor)
+    rng = PaddedRandom(list(layout["draws"]))
+    windows = sum(replace_rectangles(images[variant], *replacement, scale_factor, rng)
+                  for replacement in config.window_replacements)
+    doors = sum(replace_rectangles(images[variant], *replacement, scale_factor, rng)
+                for replacement in config.door_replacements)
+  return images, windows, doors
+
+
+def test_stamps_match_full_resolution():
+  for seed, index in plans:
+    sample = generate_sample(config, seed, index, Counter())
+    expected, windows, doors = full_resolution_symbology(sample["layout"])
+    assert (sample["metadata"]["windows"], sample["metadata"]["doors"]) == (windows, doors)
+    for variant in ["symb", "symb_room"]:
+      assert np.array_equal(sample["images"][variant], expected[variant])
+
+
+def test_split_rectangles_at_render_size():
+  for seed, index in plans[:3]:
+    layout = generate_sample(config, seed, index, Counter())["layout"]
+    for fit in ["pad", "crop"]:
+      images = render_layout(config, layout, ["symb"], 60, fit)
+      assert images["symb"].shape == (60, 60, 3)
+
+  #Narrow canvases, where cropping to the square cuts off whole openings at both ends of the long side
+  narrow = Config(min_width=40, max_width=50, min_height=100, max_height=120, plan_checks="off")
+  for seed, index in [(0, 5), (1, 1), (2, 0)]:
+    layout = generate_sample(narrow, seed, index, Counter())["layout"]
+    images = render_layout(narrow, layout, ["symb"], 120, "crop")
+    assert images["symb"].shape == (120, 120, 3)